@@ -4,19 +4,44 @@ MCP Database Server - Local Database Integration
 Translates pseudocode workflow into Python implementation for local database access.
 """
 
+import argparse
+import asyncio
+import base64
+import copy
+import hashlib
+import io
+import itertools
 import json
 import sqlite3
 import logging
-from typing import Dict, Any, Optional, Union
+import math
+import queue
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Any, AsyncIterator, Callable, Iterable, Iterator, List, Optional, Tuple, Union
 from dataclasses import dataclass
+from urllib.parse import quote
 import os
-from pathlib import Path
+import sys
+import types
+
+__version__ = '0.1.0'
 
 try:
     import redis
     REDIS_AVAILABLE = True
+    try:
+        import redis.asyncio as redis_asyncio
+    except ImportError:
+        redis_asyncio = None
 except ImportError:
     REDIS_AVAILABLE = False
+    redis_asyncio = None
 
 try:
     import psycopg2
@@ -31,6 +56,7 @@ except ImportError:
 
 try:
     import pymysql  # Use pymysql as the default MySQL driver
+    import pymysql.cursors
     MYSQL_DRIVER = 'pymysql'
     MYSQL_AVAILABLE = True
 except ImportError:
@@ -43,6 +69,70 @@ try:
 except ImportError:
     MONGODB_AVAILABLE = False
 
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+# Statements that change per-connection session state in MySQL
+_SESSION_STATEMENT_RE = re.compile(
+    r'\s*(SET\s|USE\s|LOCK\s|CREATE\s+TEMPORARY\s|PREPARE\s)',
+    re.IGNORECASE
+)
+
+SUPPORTED_BACKENDS = ('sqlite', 'postgresql', 'mysql', 'mongodb')
+
+# Prefix for cache keys the server derives itself (see _derive_cache_key)
+AUTO_CACHE_KEY_PREFIX = 'mcp:q:'
+
+# Quoted SQL literals/identifiers, or runs of whitespace outside them
+_SQL_NORMALIZE_RE = re.compile(r"""('(?:[^']|'')*'|"(?:[^"]|"")*"|`[^`]*`)|\s+""")
+
+# Redis key prefix for sets of cache keys that depend on a table
+CACHE_TAG_PREFIX = 'mcp:tag:'
+
+# Tag sets are sorted sets scored by each member's expiry time, so members whose
+# entries have expired can be pruned instead of accumulating forever.
+# Add cache key ARGV[1], expiring at ARGV[2], to every tag set in KEYS and prune
+# members that expired before ARGV[3] (now)
+_TAG_ENTRY_SCRIPT = """
+for _, tag in ipairs(KEYS) do
+    redis.call('ZADD', tag, ARGV[2], ARGV[1])
+    redis.call('ZREMRANGEBYSCORE', tag, '-inf', ARGV[3])
+    -- The set lives exactly as long as its longest-lived member
+    local last = redis.call('ZRANGE', tag, -1, -1, 'WITHSCORES')
+    redis.call('EXPIREAT', tag, math.ceil(tonumber(last[2])))
+end
+return 0
+"""
+
+# Delete every cache key in the tag sets in KEYS that is still live at ARGV[1] (now),
+# then the sets themselves
+_PURGE_TAGS_SCRIPT = """
+local removed = 0
+for _, tag in ipairs(KEYS) do
+    local members = redis.call('ZRANGEBYSCORE', tag, ARGV[1], '+inf')
+    for i = 1, #members, 500 do
+        removed = removed + redis.call('DEL', unpack(members, i, math.min(i + 499, #members)))
+    end
+    redis.call('DEL', tag)
+end
+return removed
+"""
+
+# Redis key prefix for cross-process cache fill locks
+FILL_LOCK_PREFIX = 'mcp:fill-lock:'
+
+# Delete a lock only if it still holds our token
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
 @dataclass
 class DatabaseRequest:
     """Represents a client request to the MCP server"""
@@ -51,6 +141,1564 @@ class DatabaseRequest:
     query: Optional[str] = None
     parameters: Optional[Dict[str, Any]] = None
     cache_key: Optional[str] = None
+    stream: bool = False
+    request_id: Optional[str] = None
+    chunk_size: Optional[int] = None
+    server_side: Optional[bool] = None
+    result_format: str = 'dicts'
+    database: Optional[str] = None
+
+# Named PRAGMA sets for config['sqlite']['pragma_profile']; config['sqlite']['pragma_profiles']
+# can add to or override them. Sizes: cache_size < 0 is KiB, mmap_size is bytes.
+SQLITE_PRAGMA_PROFILES: Dict[str, Dict[str, Any]] = {
+    'read_heavy': {
+        'busy_timeout': 5000,
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'mmap_size': 268435456,
+        'cache_size': -65536,
+        'temp_store': 'MEMORY',
+    },
+    'write_heavy': {
+        'busy_timeout': 10000,
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'mmap_size': 67108864,
+        'cache_size': -32768,
+        'temp_store': 'MEMORY',
+        'wal_autocheckpoint': 4000,
+    },
+    'durable': {
+        'busy_timeout': 30000,
+        'journal_mode': 'WAL',
+        'synchronous': 'FULL',
+        'mmap_size': 0,
+        'cache_size': -16384,
+        'temp_store': 'DEFAULT',
+    },
+}
+# PRAGMAs applied ahead of the rest: waiting on locks must be in place before switching journals
+_PRAGMA_FIRST = ('busy_timeout', 'journal_mode')
+# Write-side PRAGMAs that cannot be set on a read-only connection
+_WRITE_PRAGMAS = ('journal_mode', 'synchronous', 'wal_autocheckpoint')
+_PRAGMA_NAMES = {
+    'synchronous': {0: 'OFF', 1: 'NORMAL', 2: 'FULL', 3: 'EXTRA'},
+    'temp_store': {0: 'DEFAULT', 1: 'FILE', 2: 'MEMORY'},
+}
+
+def sqlite_pragmas(config: Dict[str, Any]) -> Dict[str, Any]:
+    """Resolve pragma_profile plus explicit pragmas from config['sqlite'] into one ordered dict"""
+    profile = config.get('pragma_profile')
+    pragmas: Dict[str, Any] = {}
+    if profile:
+        profiles = {**SQLITE_PRAGMA_PROFILES, **config.get('pragma_profiles', {})}
+        if profile not in profiles:
+            raise ValueError(f"Unknown SQLite pragma_profile: {profile}")
+        pragmas.update(profiles[profile])
+    pragmas.update(config.get('pragmas') or {})
+    for name, value in pragmas.items():
+        if not re.fullmatch(r'\w+', name) or not re.fullmatch(r'-?\w+', str(value)):
+            raise ValueError(f"Invalid SQLite PRAGMA: {name} = {value}")
+    first = [name for name in _PRAGMA_FIRST if name in pragmas]
+    return {name: pragmas[name] for name in first + [n for n in pragmas if n not in first]}
+
+class SQLitePool:
+    """Pool of SQLite connections: a fixed set of readers and a single writer"""
+    
+    def __init__(self, db_path: str, size: int = 4, idle_timeout: float = 300.0,
+                 timeout: float = 30.0, pragmas: Optional[Dict[str, Any]] = None,
+                 read_only: bool = False, immutable: bool = False, uri: bool = False):
+        self.db_path = db_path
+        self.uri = uri
+        self.immutable = immutable
+        self.read_only = read_only or immutable
+        self.pragmas = pragmas or {}
+        self.applied_pragmas: Dict[str, Any] = {}
+        self.size = max(1, int(size))
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self._cond = threading.Condition()
+        self._idle: List[Tuple[sqlite3.Connection, float]] = []
+        self._open_readers = 0
+        self._writer: Optional[sqlite3.Connection] = None
+        self._writer_last_used = 0.0
+        self._writer_lock = threading.Lock()
+        self._dir_ready = False
+        self._closed = False
+        self._stats = {
+            'connections_opened': 0,
+            'connections_reaped': 0,
+            'reader_checkouts': 0,
+            'writer_checkouts': 0,
+            'waits': 0,
+        }
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open a new connection configured for pooled use"""
+        if self.uri:
+            conn = sqlite3.connect(self.db_path, uri=True, timeout=self.timeout, check_same_thread=False)
+        elif self.read_only:
+            # immutable=1 also skips locking and change detection; only for files nobody writes
+            uri = f"file:{quote(os.path.abspath(self.db_path))}?mode=ro"
+            if self.immutable:
+                uri += "&immutable=1"
+            conn = sqlite3.connect(uri, uri=True, timeout=self.timeout, check_same_thread=False)
+        else:
+            if not self._dir_ready:
+                directory = os.path.dirname(self.db_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._dir_ready = True
+            conn = sqlite3.connect(self.db_path, timeout=self.timeout, check_same_thread=False)
+        conn.row_factory = sqlite3.Row  # Enable dict-like access
+        if self.pragmas:
+            self._apply_pragmas(conn)
+        with self._cond:
+            self._stats['connections_opened'] += 1
+        return conn
+    
+    def _apply_pragmas(self, conn: sqlite3.Connection) -> None:
+        """Set the configured PRAGMAs and record the values SQLite reports back"""
+        applied = {}
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+            row = conn.execute(f"PRAGMA {name}").fetchone()
+            actual = row[0] if row is not None else None
+            applied[name] = _PRAGMA_NAMES.get(name, {}).get(actual, actual)
+        self.applied_pragmas = applied
+    
+    def open_connection(self) -> sqlite3.Connection:
+        """Open an unpooled connection with the pool's settings; the caller closes it"""
+        return self._connect()
+    
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        """Check out a reader connection for the duration of the block"""
+        conn = self._acquire_reader()
+        try:
+            yield conn
+        finally:
+            self._release_reader(conn)
+    
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        """Check out the single writer connection; commits on success, rolls back on error"""
+        if self.read_only:
+            raise RuntimeError(f"SQLite database {self.db_path} is read-only")
+        if not self._writer_lock.acquire(timeout=self.timeout):
+            raise RuntimeError(f"Timed out waiting for SQLite writer on {self.db_path}")
+        try:
+            if self._closed:
+                raise RuntimeError("SQLite pool is closed")
+            if self._writer is None:
+                self._writer = self._connect()
+            self._stats['writer_checkouts'] += 1
+            try:
+                yield self._writer
+                self._writer.commit()
+            except BaseException:
+                self._writer.rollback()
+                raise
+        finally:
+            self._writer_last_used = time.monotonic()
+            self._writer_lock.release()
+    
+    def _acquire_reader(self) -> sqlite3.Connection:
+        deadline = time.monotonic() + self.timeout
+        conn = None
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("SQLite pool is closed")
+                if self._idle:
+                    conn, _ = self._idle.pop()
+                    break
+                if self._open_readers < self.size:
+                    # Reserve the slot; the connection is opened outside the lock
+                    self._open_readers += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise RuntimeError(f"Timed out waiting for SQLite reader on {self.db_path}")
+                self._stats['waits'] += 1
+                self._cond.wait(remaining)
+        
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._open_readers -= 1
+                    self._cond.notify()
+                raise
+        with self._cond:
+            self._stats['reader_checkouts'] += 1
+        return conn
+    
+    def _release_reader(self, conn: sqlite3.Connection) -> None:
+        if conn.in_transaction:
+            conn.rollback()
+        with self._cond:
+            if self._closed:
+                expired = [conn]
+                self._open_readers -= 1
+            else:
+                # LIFO reuse keeps hot connections warm and lets cold ones age out
+                self._idle.append((conn, time.monotonic()))
+                expired = self._reap_locked()
+            self._cond.notify()
+        for stale in expired:
+            stale.close()
+    
+    def _reap_locked(self) -> List[sqlite3.Connection]:
+        """Take readers idle past idle_timeout out of the pool; the caller closes them unlocked"""
+        if self.idle_timeout is None or self.idle_timeout <= 0:
+            return []
+        cutoff = time.monotonic() - self.idle_timeout
+        expired = []
+        while self._idle and self._idle[0][1] < cutoff:
+            conn, _ = self._idle.pop(0)
+            expired.append(conn)
+            self._open_readers -= 1
+            self._stats['connections_reaped'] += 1
+        return expired
+    
+    def reap_idle(self) -> None:
+        """Close reader and writer connections idle for longer than idle_timeout"""
+        with self._cond:
+            expired = self._reap_locked()
+        for conn in expired:
+            conn.close()
+        if self.idle_timeout and self._writer_lock.acquire(blocking=False):
+            try:
+                if (self._writer is not None and
+                        time.monotonic() - self._writer_last_used > self.idle_timeout):
+                    self._writer.close()
+                    self._writer = None
+                    with self._cond:
+                        self._stats['connections_reaped'] += 1
+            finally:
+                self._writer_lock.release()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return pool counters and current occupancy"""
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update({
+                'db_path': self.db_path,
+                'size': self.size,
+                'readers_open': self._open_readers,
+                'readers_idle': len(self._idle),
+                'readers_in_use': self._open_readers - len(self._idle),
+                'writer_open': self._writer is not None,
+                'read_only': self.read_only,
+                'immutable': self.immutable,
+            })
+            if self.applied_pragmas:
+                stats['pragmas'] = dict(self.applied_pragmas)
+        return stats
+    
+    def close(self) -> None:
+        """Close all idle connections; checked-out readers are closed on release"""
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                conn.close()
+                self._open_readers -= 1
+            self._cond.notify_all()
+        with self._writer_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+# SQLite statements that cannot run inside the group-commit transaction
+_SQLITE_TRANSACTION_CONTROL_RE = re.compile(
+    r'\s*(?:BEGIN|COMMIT|END|ROLLBACK|SAVEPOINT|RELEASE|VACUUM|PRAGMA|ATTACH|DETACH)\b',
+    re.IGNORECASE
+)
+
+class SQLiteWriteQueue:
+    """
+    Group commit for one SQLite database
+    
+    A dedicated thread takes queued writes and runs up to max_batch of them,
+    waiting at most max_wait seconds for more after the first, in a single
+    transaction. Each write runs under its own SAVEPOINT, so a failing
+    statement only fails its own caller. Callers get a Future that resolves
+    with their rowcount / lastrowid once the shared commit has succeeded.
+    """
+    
+    def __init__(self, pool: SQLitePool, max_batch: int = 64, max_wait: float = 0.001):
+        self.pool = pool
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait)
+        self._queue: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._stats = {'batches': 0, 'writes': 0, 'failed_writes': 0,
+                       'failed_commits': 0, 'largest_batch': 0}
+        self._thread = threading.Thread(target=self._run, name='mcp-sqlite-writer', daemon=True)
+        self._thread.start()
+    
+    def submit(self, query: str, parameters: Any) -> Future:
+        """Queue a write; the Future resolves with {"affected_rows", "lastrowid"} after commit"""
+        future: Future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("SQLite write queue is closed")
+            self._queue.put((query, parameters, future))
+        return future
+    
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            stop = False
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            self._commit(batch)
+            if stop:
+                return
+    
+    def _commit(self, batch: List[Tuple[str, Any, Future]]) -> None:
+        completed = []
+        failed = []
+        try:
+            with self.pool.writer() as conn:
+                # An explicit BEGIN keeps the first RELEASE from committing on its own
+                if not conn.in_transaction:
+                    conn.execute("BEGIN")
+                for query, parameters, future in batch:
+                    conn.execute("SAVEPOINT mcp_write")
+                    try:
+                        cursor = conn.execute(query, parameters)
+                    except Exception as e:
+                        conn.execute("ROLLBACK TO mcp_write")
+                        conn.execute("RELEASE mcp_write")
+                        failed.append((future, e))
+                        continue
+                    conn.execute("RELEASE mcp_write")
+                    completed.append((future, {"affected_rows": cursor.rowcount,
+                                               "lastrowid": cursor.lastrowid}))
+        except Exception as e:
+            # Nothing in this batch reached disk
+            with self._lock:
+                self._stats['failed_commits'] += 1
+            errors = {id(future): error for future, error in failed}
+            for _, _, future in batch:
+                future.set_exception(errors.get(id(future), e))
+            return
+        with self._lock:
+            self._stats['batches'] += 1
+            self._stats['writes'] += len(completed)
+            self._stats['failed_writes'] += len(failed)
+            self._stats['largest_batch'] = max(self._stats['largest_batch'], len(batch))
+        for future, result in completed:
+            future.set_result(result)
+        for future, error in failed:
+            future.set_exception(error)
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats['queued'] = self._queue.qsize()
+        stats['writes_per_commit'] = round(stats['writes'] / stats['batches'], 2) if stats['batches'] else 0.0
+        return stats
+    
+    def close(self) -> None:
+        """Finish the writes already queued, then stop the writer thread"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join()
+
+# Names this process in change-detection stamps; data_version is only comparable on one connection
+_PROCESS_TOKEN = os.urandom(4).hex()
+
+class SQLiteChangeDetector:
+    """
+    Cheap check of whether a SQLite file changed: PRAGMA data_version plus file identity
+    
+    data_version moves whenever another connection, in any process, commits to
+    the file, but its values only mean something on the connection that read
+    them. The detector keeps one connection for that, and its stamps carry a
+    token naming it. When the file is replaced (new device/inode) the
+    connection is reopened under a new token and on_replace is called.
+    """
+    
+    _tokens = itertools.count(1)
+    
+    def __init__(self, source: SQLitePool, on_replace: Optional[Callable[[], None]] = None):
+        self.source = source
+        self.on_replace = on_replace
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._identity: Optional[Tuple[int, int]] = None
+        self._token = ''
+    
+    def stamp(self) -> List[Any]:
+        """Return [token, dev, ino, data_version] for the file as it is now"""
+        st = os.stat(self.source.db_path)
+        identity = (st.st_dev, st.st_ino)
+        replaced = False
+        with self._lock:
+            if self._conn is None or identity != self._identity:
+                replaced = self._conn is not None
+                if self._conn is not None:
+                    self._conn.close()
+                self._conn = self.source.open_connection()
+                self._identity = identity
+                self._token = f"{_PROCESS_TOKEN}:{next(self._tokens)}"
+            version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            stamp = [self._token, identity[0], identity[1], version]
+        if replaced and self.on_replace is not None:
+            self.on_replace()
+        return stamp
+    
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+class SQLiteReplica:
+    """
+    In-memory copy of a SQLite database that serves reads from RAM
+    
+    Each refresh copies the file with Connection.backup into a new memdb
+    database and swaps in a reader pool over it; reads already running on the
+    previous copy finish there. A watcher thread polls PRAGMA data_version on
+    its own connection to the file, so commits from any other connection or
+    process trigger a refresh, as does refresh_interval when set. When the
+    path points at a different file (replaced or restored), the watcher is
+    reopened on it before copying.
+    """
+    
+    _names = itertools.count(1)
+    
+    def __init__(self, source: SQLitePool, size: int = 4, check_interval: float = 1.0,
+                 refresh_interval: float = 0.0, logger: Optional[logging.Logger] = None):
+        self.source = source
+        self.size = size
+        self.check_interval = max(0.01, check_interval)
+        self.refresh_interval = refresh_interval
+        self.logger = logger
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._pool: Optional[SQLitePool] = None
+        self._holder: Optional[sqlite3.Connection] = None
+        self._watcher: Optional[sqlite3.Connection] = None
+        self._identity: Optional[Tuple[int, int]] = None  # (st_dev, st_ino) of the watcher's file
+        self._version: Optional[int] = None
+        self._stamp: List[Any] = []
+        self.token = f"{_PROCESS_TOKEN}:replica-{next(self._names)}"
+        self._refreshed_at = 0.0
+        self._wake = threading.Event()
+        self._stopped = False
+        self._stats = {'reads': 0, 'refreshes': 0, 'refresh_failures': 0, 'last_refresh_ms': 0.0}
+        self.refresh()
+        self._thread = threading.Thread(target=self._watch, name='mcp-sqlite-replica', daemon=True)
+        self._thread.start()
+    
+    @property
+    def pool(self) -> SQLitePool:
+        """Reader pool over the current in-memory copy"""
+        with self._lock:
+            return self._pool
+    
+    def refresh(self) -> None:
+        """Copy the database into a new in-memory generation and route readers to it"""
+        with self._refresh_lock:
+            started = time.perf_counter()
+            self._open_watcher()
+            identity = self._identity
+            version = self._watcher.execute("PRAGMA data_version").fetchone()[0]
+            # memdb databases are shared by name within the process and live while a connection is open
+            name = f"file:/mcp-replica-{next(self._names)}?vfs=memdb"
+            holder = sqlite3.connect(name, uri=True, check_same_thread=False)
+            try:
+                self._copy_into(holder)
+            except BaseException:
+                holder.close()
+                raise
+            pool = SQLitePool(name, size=self.size, idle_timeout=self.source.idle_timeout,
+                              pragmas={'query_only': 1}, uri=True)
+            with self._lock:
+                old_pool, old_holder = self._pool, self._holder
+                self._pool, self._holder, self._version = pool, holder, version
+                # Describes the file the copy was taken from, not whatever the path names now
+                self._stamp = [self.token, identity[0], identity[1], version]
+                self._refreshed_at = time.monotonic()
+                self._stats['refreshes'] += 1
+                self._stats['last_refresh_ms'] = round((time.perf_counter() - started) * 1000, 3)
+            if old_pool is not None:
+                old_pool.close()
+                old_holder.close()
+    
+    def _open_watcher(self) -> None:
+        """(Re)open the watcher when the path no longer names the file it has open"""
+        # Stat before opening: if the file is swapped in between, the next check reopens again
+        st = os.stat(self.source.db_path)
+        identity = (st.st_dev, st.st_ino)
+        if self._watcher is not None and identity == self._identity:
+            return
+        if self._watcher is not None:
+            self._watcher.close()
+            self._watcher = None
+        self._watcher = self.source.open_connection()
+        self._identity = identity
+    
+    def _replaced(self) -> bool:
+        st = os.stat(self.source.db_path)
+        return (st.st_dev, st.st_ino) != self._identity
+    
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        """Check out a connection to the current copy, retrying if a refresh retires it first"""
+        while True:
+            pool = self.pool
+            if pool is None:
+                raise RuntimeError(f"SQLite replica of {self.source.db_path} is closed")
+            try:
+                conn = pool._acquire_reader()
+                break
+            except RuntimeError:
+                if pool is self.pool:
+                    raise
+        with self._lock:
+            self._stats['reads'] += 1
+        try:
+            yield conn
+        finally:
+            pool._release_reader(conn)
+    
+    def _copy_into(self, holder: sqlite3.Connection) -> None:
+        if self._watcher.execute("PRAGMA journal_mode").fetchone()[0] != 'wal':
+            self._watcher.backup(holder)
+            return
+        # A backup keeps the WAL marker in the header (bytes 18-19) and memdb cannot open WAL
+        # databases, so copy a serialized image marked as a rollback-journal database instead
+        image = bytearray(self._watcher.serialize())
+        image[18:20] = b'\x01\x01'
+        scratch = sqlite3.connect(':memory:')
+        try:
+            scratch.deserialize(image)
+            scratch.backup(holder)
+        finally:
+            scratch.close()
+    
+    def stamp(self) -> List[Any]:
+        """Change-detection stamp of the copy readers currently see, shaped like SQLiteChangeDetector's"""
+        with self._lock:
+            return list(self._stamp)
+    
+    def notify_write(self) -> None:
+        """Wake the watcher after a write through this server instead of waiting for the next poll"""
+        self._wake.set()
+    
+    def _watch(self) -> None:
+        while True:
+            self._wake.wait(self.check_interval)
+            self._wake.clear()
+            if self._stopped:
+                return
+            try:
+                due = (self.refresh_interval > 0 and
+                       time.monotonic() - self._refreshed_at >= self.refresh_interval)
+                with self._refresh_lock:
+                    replaced = self._replaced()
+                    version = self._watcher.execute("PRAGMA data_version").fetchone()[0]
+                if due or replaced or version != self._version:
+                    self.refresh()
+            except Exception as e:
+                with self._lock:
+                    self._stats['refresh_failures'] += 1
+                if self.logger is not None:
+                    self.logger.warning(f"SQLite replica refresh for {self.source.db_path} failed: {e}")
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['data_version'] = self._version
+            stats['age_seconds'] = round(time.monotonic() - self._refreshed_at, 3)
+        return stats
+    
+    def close(self) -> None:
+        self._stopped = True
+        self._wake.set()
+        if self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join()
+        with self._refresh_lock, self._lock:
+            if self._pool is not None:
+                self._pool.close()
+                self._holder.close()
+                self._pool = self._holder = None
+            if self._watcher is not None:
+                self._watcher.close()
+                self._watcher = None
+
+class _PooledConnection:
+    """Bookkeeping wrapper for a connection held by ConnectionPool"""
+    __slots__ = ('conn', 'created_at', 'last_used', 'retired')
+    
+    def __init__(self, conn: Any):
+        self.conn = conn
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.retired = False
+
+class ConnectionPool:
+    """Bounded pool of DB-API connections with warm-up, validation on checkout and lifetime limits
+    
+    The pool only depends on the ``connect`` factory and the optional ``validate``
+    and ``reset`` hooks, so it can be exercised with any DB-API compatible stand-in.
+    """
+    
+    def __init__(self, connect: Callable[[], Any], min_size: int = 1, max_size: int = 10,
+                 max_lifetime: Optional[float] = 3600.0, timeout: float = 30.0,
+                 validate: Optional[Callable[[Any, float], bool]] = None,
+                 reset: Optional[Callable[[Any], None]] = None, name: str = 'pool'):
+        self.name = name
+        self.min_size = max(0, int(min_size))
+        self.max_size = max(1, int(max_size), self.min_size)
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+        self._connect = connect
+        self._validate = validate
+        self._reset = reset
+        self._cond = threading.Condition()
+        self._idle: List[_PooledConnection] = []
+        self._checked_out: Dict[int, _PooledConnection] = {}
+        self._size = 0
+        self._closed = False
+        self._stats = {
+            'connections_opened': 0,
+            'connections_closed': 0,
+            'connections_retired': 0,
+            'validation_failures': 0,
+            'lifetime_expired': 0,
+            'checkouts': 0,
+            'waits': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+        }
+    
+    def warm_up(self) -> int:
+        """Open connections until min_size are available; returns the number opened"""
+        opened = 0
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return opened
+                self._size += 1
+            try:
+                entry = _PooledConnection(self._connect())
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._stats['connections_opened'] += 1
+                self._idle.append(entry)
+                self._cond.notify()
+            opened += 1
+    
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """Check out a validated connection for the duration of the block"""
+        entry = self._acquire()
+        broken = False
+        try:
+            yield entry.conn
+        except BaseException:
+            broken = entry.retired or not self._try_reset(entry)
+            raise
+        else:
+            broken = entry.retired or not self._try_reset(entry)
+        finally:
+            self._release(entry, broken)
+    
+    def _acquire(self) -> _PooledConnection:
+        started = time.monotonic()
+        deadline = started + self.timeout
+        waited = False
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise RuntimeError(f"{self.name} connection pool is closed")
+                    if self._idle:
+                        entry = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        entry = None
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise RuntimeError(
+                            f"Timed out after {self.timeout}s waiting for a {self.name} connection"
+                        )
+                    waited = True
+                    self._cond.wait(remaining)
+            
+            if entry is None:
+                try:
+                    entry = _PooledConnection(self._connect())
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._stats['connections_opened'] += 1
+            elif not self._check(entry):
+                self._discard(entry)
+                continue
+            
+            wait_time = time.monotonic() - started
+            with self._cond:
+                self._checked_out[id(entry.conn)] = entry
+                self._stats['checkouts'] += 1
+                if waited:
+                    self._stats['waits'] += 1
+                self._stats['wait_time_total'] += wait_time
+                self._stats['wait_time_max'] = max(self._stats['wait_time_max'], wait_time)
+            return entry
+    
+    def _check(self, entry: _PooledConnection) -> bool:
+        """Apply lifetime and health checks to an idle connection before handing it out"""
+        now = time.monotonic()
+        if self.max_lifetime and now - entry.created_at > self.max_lifetime:
+            with self._cond:
+                self._stats['lifetime_expired'] += 1
+            return False
+        if self._validate is not None:
+            try:
+                healthy = self._validate(entry.conn, now - entry.last_used)
+            except Exception:
+                healthy = False
+            if not healthy:
+                with self._cond:
+                    self._stats['validation_failures'] += 1
+                return False
+        return True
+    
+    def retire(self, conn: Any) -> None:
+        """Close a checked-out connection on release instead of returning it to the pool"""
+        with self._cond:
+            entry = self._checked_out.get(id(conn))
+            if entry is not None and not entry.retired:
+                entry.retired = True
+                self._stats['connections_retired'] += 1
+    
+    def _try_reset(self, entry: _PooledConnection) -> bool:
+        if self._reset is None:
+            return True
+        try:
+            self._reset(entry.conn)
+            return True
+        except Exception:
+            return False
+    
+    def _release(self, entry: _PooledConnection, broken: bool = False) -> None:
+        with self._cond:
+            self._checked_out.pop(id(entry.conn), None)
+        if broken or entry.retired or self._closed:
+            self._discard(entry)
+            return
+        entry.last_used = time.monotonic()
+        with self._cond:
+            self._idle.append(entry)
+            self._cond.notify()
+    
+    def _discard(self, entry: _PooledConnection) -> None:
+        try:
+            entry.conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._stats['connections_closed'] += 1
+            self._cond.notify()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return pool counters, occupancy and checkout wait-time metrics"""
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update({
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+            })
+        checkouts = stats['checkouts']
+        stats['wait_time_avg'] = stats['wait_time_total'] / checkouts if checkouts else 0.0
+        return stats
+    
+    def close(self) -> None:
+        """Close idle connections; connections still checked out are closed on release"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for entry in idle:
+            self._discard(entry)
+
+_IDENT = r'(?:"[^"]+"|`[^`]+`|\[[^\]]+\]|[\w$]+)(?:\s*\.\s*(?:"[^"]+"|`[^`]+`|\[[^\]]+\]|[\w$]+))*'
+_IDENT_RE = re.compile(_IDENT)
+_FROM_RE = re.compile(
+    r'\bFROM\s+(' + _IDENT + r'(?:\s+(?:AS\s+)?[\w$]+)?(?:\s*,\s*' + _IDENT +
+    r'(?:\s+(?:AS\s+)?[\w$]+)?)*)',
+    re.IGNORECASE
+)
+_JOIN_RE = re.compile(r'\bJOIN\s+(' + _IDENT + r')', re.IGNORECASE)
+_WRITE_TARGET_RE = re.compile(
+    r'\b(?:INSERT(?:\s+OR\s+\w+)?(?:\s+IGNORE)?\s+INTO|REPLACE\s+INTO|'
+    r'UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM|TRUNCATE(?:\s+TABLE)?|'
+    r'DROP\s+TABLE(?:\s+IF\s+EXISTS)?|ALTER\s+TABLE|MERGE\s+INTO)\s+(' + _IDENT + r')',
+    re.IGNORECASE
+)
+# Statements that cannot change cached rows, so they invalidate nothing
+_NON_MUTATING_RE = re.compile(
+    r'\s*(?:CREATE|PRAGMA|EXPLAIN|ANALYZE|BEGIN|COMMIT|SAVEPOINT|RELEASE|SET|SHOW|DESCRIBE|USE)\b',
+    re.IGNORECASE
+)
+
+# Point lookups micro-batching can merge: a plain column list, one table, one equality
+_POINT_LOOKUP_RE = re.compile(
+    r'^\s*SELECT\s+(?P<columns>.+?)\s+FROM\s+(?P<table>' + _IDENT + r')\s+WHERE\s+(?P<key>' +
+    _IDENT + r')\s*=\s*(?:\?|%s)\s*;?\s*$',
+    re.IGNORECASE | re.DOTALL
+)
+_BATCH_KEY_COLUMN = '_mcp_batch_key'
+_BATCHABLE_TYPES = (str, int, float)
+
+def _lookup_key(value: Any) -> Tuple[type, Any]:
+    """Batch key for a lookup value; 1, 1.0 and '1' are different keys"""
+    return type(value), value
+
+def _table_name(identifier: str) -> str:
+    """Unqualified, unquoted, lower-cased table name"""
+    name = re.split(r'\s*\.\s*', identifier)[-1]
+    return name.strip('"`[]').lower()
+
+def extract_read_tables(query: str) -> set:
+    """Best-effort set of tables a SELECT reads (FROM lists and JOINs)"""
+    tables = set()
+    for match in _FROM_RE.finditer(query):
+        for part in match.group(1).split(','):
+            ident = _IDENT_RE.match(part.strip())
+            if ident:
+                tables.add(_table_name(ident.group(0)))
+    for match in _JOIN_RE.finditer(query):
+        tables.add(_table_name(match.group(1)))
+    return tables
+
+def extract_write_tables(query: str) -> set:
+    """Best-effort set of tables a write statement modifies"""
+    tables = {_table_name(m.group(1)) for m in _WRITE_TARGET_RE.finditer(query)}
+    tables.update(_table_name(m.group(1)) for m in _JOIN_RE.finditer(query))
+    return tables
+
+RESULT_FORMATS = ('dicts', 'columnar', 'rows', 'numpy')
+
+def cursor_columns(cursor: Any) -> List[str]:
+    """Column names from a DB-API cursor description"""
+    return [desc[0] for desc in cursor.description or ()]
+
+def shape_rows(columns: List[str], rows: List[Any], result_format: str) -> Any:
+    """
+    Shape tuple rows for the requested result format
+    
+    'dicts' gives one dict per row, 'rows' returns the tuples as they are, and
+    'columnar' gives {"columns": [...], "data": [...]} with one value array per column.
+    """
+    if result_format == 'rows':
+        return rows if isinstance(rows, list) else list(rows)
+    if result_format == 'columnar':
+        data = [list(values) for values in zip(*rows)] if rows else [[] for _ in columns]
+        return {"columns": columns, "data": data}
+    return [dict(zip(columns, row)) for row in rows]
+
+def chunk_row_count(chunk: Any) -> int:
+    """Number of rows in a shaped result or streamed chunk"""
+    if isinstance(chunk, dict):
+        if 'length' in chunk:
+            return chunk['length']
+        data = chunk.get('data') or []
+        return len(data[0]) if data else 0
+    return len(chunk)
+
+# Column kinds for NumPy results, ordered so that max() gives the common kind
+_KIND_EMPTY, _KIND_BOOL, _KIND_INT, _KIND_FLOAT, _KIND_OBJECT = range(5)
+_KIND_DTYPES = {_KIND_BOOL: 'bool', _KIND_INT: 'int64', _KIND_FLOAT: 'float64', _KIND_OBJECT: 'object'}
+_VALUE_KINDS = {bool: _KIND_BOOL, int: _KIND_INT, float: _KIND_FLOAT}
+
+# Cursor description type codes with a known NumPy kind, per backend
+_DESCRIPTION_KINDS = {
+    # PostgreSQL type OIDs: bool, int8, int2, int4, float4, float8
+    'postgresql': {16: _KIND_BOOL, 20: _KIND_INT, 21: _KIND_INT, 23: _KIND_INT,
+                   700: _KIND_FLOAT, 701: _KIND_FLOAT},
+    # pymysql FIELD_TYPE codes: TINY, SHORT, LONG, FLOAT, DOUBLE, LONGLONG, INT24
+    'mysql': {1: _KIND_INT, 2: _KIND_INT, 3: _KIND_INT, 4: _KIND_FLOAT, 5: _KIND_FLOAT,
+              8: _KIND_INT, 9: _KIND_INT},
+}
+
+def _column_kind(kind: int, values: List[Any]) -> int:
+    """
+    Smallest kind that holds the column so far plus a new batch
+    
+    NULLs become NaN, so they push int columns to float and bool (or
+    still untyped) columns to object.
+    """
+    has_null = False
+    for value in values:
+        if value is None:
+            has_null = True
+            continue
+        value_kind = _VALUE_KINDS.get(type(value), _KIND_OBJECT)
+        if value_kind == _KIND_OBJECT:
+            return _KIND_OBJECT
+        if value_kind > kind:
+            kind = value_kind
+    if has_null and kind != _KIND_FLOAT:
+        return _KIND_FLOAT if kind == _KIND_INT else _KIND_OBJECT
+    return kind
+
+class _ColumnBuilder:
+    """Growable typed array for one result column; promotes its dtype as batches require"""
+    
+    __slots__ = ('kind', 'array', 'length')
+    
+    def __init__(self, kind: int = _KIND_EMPTY):
+        self.kind = kind
+        self.array = None
+        self.length = 0
+    
+    def extend(self, values: List[Any]) -> None:
+        kind = _column_kind(self.kind, values)
+        needed = self.length + len(values)
+        if self.array is None:
+            self.array = np.empty(max(needed, 1024), dtype=_KIND_DTYPES[kind])
+        elif kind != self.kind:
+            self.array = self.array.astype(_KIND_DTYPES[kind])
+        if needed > len(self.array):
+            grown = np.empty(max(needed, 2 * len(self.array)), dtype=self.array.dtype)
+            grown[:self.length] = self.array[:self.length]
+            self.array = grown
+        self.kind = kind
+        try:
+            self.array[self.length:needed] = values
+        except (OverflowError, TypeError, ValueError):
+            # e.g. integers beyond int64 - keep the exact Python values instead
+            self.kind = _KIND_OBJECT
+            self.array = self.array.astype(object)
+            self.array[self.length:needed] = values
+        self.length = needed
+    
+    def finish(self) -> Any:
+        if self.array is None:
+            return np.empty(0, dtype=_KIND_DTYPES.get(self.kind, 'object'))
+        return self.array[:self.length].copy()
+
+def fetch_arrays(cursor: Any, db_type: str, batch_size: int) -> Dict[str, Any]:
+    """
+    Read a cursor into one NumPy array per column, a fetchmany batch at a time
+    
+    Dtypes start from the cursor description where the backend reports a known
+    type and are otherwise chosen from the values; columns that mix types fall
+    back to object arrays.
+    """
+    if not NUMPY_AVAILABLE:
+        raise RuntimeError("NumPy is not available; install numpy to use result_format 'numpy'")
+    known = _DESCRIPTION_KINDS.get(db_type, {})
+    batches = iter_fetchmany(cursor, batch_size)
+    # A named (server-side) cursor has no description until its first fetch
+    first = next(batches, None)
+    description = cursor.description or ()
+    builders = [_ColumnBuilder(known.get(desc[1], _KIND_EMPTY)) for desc in description]
+    for rows in itertools.chain([first] if first else [], batches):
+        for builder, values in zip(builders, zip(*rows)):
+            builder.extend(list(values))
+    return {desc[0]: builder.finish() for desc, builder in zip(description, builders)}
+
+def encode_arrays(arrays: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    JSON-safe form of fetch_arrays() output
+    
+    Typed columns are sent as base64 of their raw buffer with the dtype string;
+    object columns are sent as plain value lists.
+    """
+    columns = list(arrays)
+    dtypes, data = [], []
+    for array in arrays.values():
+        if array.dtype == object:
+            dtypes.append('object')
+            data.append(array.tolist())
+        else:
+            dtypes.append(array.dtype.str)
+            data.append(base64.b64encode(array.tobytes()).decode('ascii'))
+    length = len(next(iter(arrays.values()))) if arrays else 0
+    return {"columns": columns, "dtypes": dtypes, "length": length, "data": data}
+
+def decode_arrays(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Rebuild the column arrays from encode_arrays() output"""
+    if not NUMPY_AVAILABLE:
+        raise RuntimeError("NumPy is not available")
+    arrays = {}
+    for name, dtype, data in zip(payload['columns'], payload['dtypes'], payload['data']):
+        if dtype == 'object':
+            array = np.empty(len(data), dtype=object)
+            array[:] = data
+        else:
+            array = np.frombuffer(base64.b64decode(data), dtype=dtype)
+        arrays[name] = array
+    return arrays
+
+# Table and column names accepted by bulk_insert, which has to splice them into SQL
+_SQL_NAME_RE = re.compile(r'^[A-Za-z_][\w$]*(?:\.[A-Za-z_][\w$]*)?$')
+
+def bulk_rows(parameters: Dict[str, Any]) -> Tuple[List[str], Iterable[Any]]:
+    """
+    Column names and row iterator of a bulk_insert payload
+    
+    Rows come either as 'rows' (lists with 'columns', or dicts) or as
+    columnar 'data', {column: [values]}.
+    """
+    data = parameters.get('data')
+    if isinstance(data, dict):
+        if len({len(values) for values in data.values()}) > 1:
+            raise ValueError("bulk_insert columns must all have the same length")
+        return list(data), zip(*data.values())
+    rows = parameters.get('rows')
+    if not isinstance(rows, list):
+        raise ValueError("bulk_insert needs 'rows' or columnar 'data'")
+    columns = parameters.get('columns')
+    if not columns and rows and isinstance(rows[0], dict):
+        columns = list(rows[0])
+    if not columns:
+        raise ValueError("bulk_insert needs 'columns' for list rows")
+    if rows and isinstance(rows[0], dict):
+        return list(columns), (tuple(row.get(column) for column in columns) for row in rows)
+    return list(columns), rows
+
+def _checked_name(name: Any) -> str:
+    if not isinstance(name, str) or not _SQL_NAME_RE.match(name):
+        raise ValueError(f"Invalid table or column name for bulk_insert: {name!r}")
+    return name
+
+def _copy_field(value: Any) -> str:
+    """One field in PostgreSQL COPY text format"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    text = json.dumps(value) if isinstance(value, (dict, list)) else str(value)
+    return (text.replace('\\', '\\\\').replace('\t', '\\t')
+                .replace('\n', '\\n').replace('\r', '\\r'))
+
+def iter_chunks(rows: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Yield lists of up to size items from rows"""
+    iterator = iter(rows)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+def iter_fetchmany(cursor: Any, size: int) -> Iterator[List[Any]]:
+    """Yield successive fetchmany batches until the cursor is exhausted"""
+    while True:
+        rows = cursor.fetchmany(size)
+        if not rows:
+            return
+        yield rows
+
+def normalize_query(query: str) -> str:
+    """Collapse whitespace outside quoted literals and drop a trailing semicolon"""
+    normalized = _SQL_NORMALIZE_RE.sub(lambda m: m.group(1) or ' ', query).strip()
+    return normalized[:-1].rstrip() if normalized.endswith(';') else normalized
+
+class CacheEntry:
+    """
+    A cached result plus the metadata used for soft expiry and early refresh
+    
+    The result is kept as its JSON payload bytes so hits can be spliced into a
+    response without decoding; ``data`` decodes a private copy for each
+    in-process caller, so no caller can alter what later hits see.
+    Stored form is a one-line JSON header, a newline, then the payload.
+    """
+    __slots__ = ('payload', 'expires_at', 'delta', 'stamp')
+    
+    def __init__(self, payload: bytes, expires_at: float, delta: float = 0.0,
+                 stamp: Optional[List[Any]] = None):
+        self.payload = payload
+        self.expires_at = expires_at  # Wall-clock soft expiry
+        self.delta = delta  # Seconds it took to compute the result
+        self.stamp = stamp  # SQLite [database, token, dev, ino, data_version] at fill time
+    
+    @classmethod
+    def from_data(cls, data: Any, expires_at: float, delta: float = 0.0,
+                  stamp: Optional[List[Any]] = None) -> 'CacheEntry':
+        payload = json.dumps(data, default=str).encode('utf-8')  # default=str handles datetime, ObjectId, etc.
+        return cls(payload, expires_at, delta, stamp)
+    
+    @property
+    def data(self) -> Any:
+        return json.loads(self.payload)
+    
+    @property
+    def size(self) -> int:
+        return len(self.payload)
+    
+    def is_fresh(self, now: Optional[float] = None) -> bool:
+        return (time.time() if now is None else now) < self.expires_at
+    
+    def should_refresh_early(self, beta: float, now: Optional[float] = None) -> bool:
+        """XFetch: refresh with a probability that rises as expiry nears, scaled by compute cost"""
+        if beta <= 0 or self.delta <= 0:
+            return False
+        now = time.time() if now is None else now
+        return now - self.delta * beta * math.log(1.0 - random.random()) >= self.expires_at
+    
+    def encode(self) -> bytes:
+        header = {'mcp': 2, 'e': self.expires_at, 'd': self.delta}
+        if self.stamp is not None:
+            header['s'] = self.stamp
+        header = json.dumps(header, separators=(',', ':'))
+        return header.encode('ascii') + b'\n' + self.payload
+    
+    @classmethod
+    def decode(cls, raw: Union[str, bytes]) -> 'CacheEntry':
+        if isinstance(raw, str):
+            raw = raw.encode('utf-8')
+        if raw.startswith(b'{"mcp":2,'):
+            # Only the short header is parsed; the payload stays encoded
+            split = raw.index(b'\n')
+            header = json.loads(raw[:split])
+            return cls(raw[split + 1:], header['e'], header.get('d', 0.0), stamp=header.get('s'))
+        value = json.loads(raw)
+        if isinstance(value, dict) and value.get('mcp') == 1 and 'v' in value:
+            return cls.from_data(value['v'], value['e'], value.get('d', 0.0))
+        # Plain payloads written before entries carried metadata; Redis TTL governs them
+        return cls(raw, float('inf'), 0.0)
+
+class RawJSON:
+    """Already-encoded JSON bytes that transports splice into their output as-is"""
+    __slots__ = ('value',)
+    
+    def __init__(self, value: bytes):
+        self.value = value
+
+class _FrequencySketch:
+    """Count-min sketch with periodic halving, used as the TinyLFU admission filter"""
+    
+    def __init__(self, capacity: int):
+        width = 1
+        while width < max(16, capacity):
+            width <<= 1
+        self._mask = width - 1
+        self._rows = [[0] * width for _ in range(4)]
+        self._additions = 0
+        self._sample_size = 10 * width
+    
+    def _indexes(self, key: str) -> Iterator[int]:
+        # splitmix64 finalizer, then double hashing: row i uses h1 + i * h2, so two keys
+        # share every row only if both 32-bit halves collide under the mask
+        h = hash(key) & 0xFFFFFFFFFFFFFFFF
+        h = ((h ^ (h >> 30)) * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF
+        h = ((h ^ (h >> 27)) * 0x94D049BB133111EB) & 0xFFFFFFFFFFFFFFFF
+        h ^= h >> 31
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        for i in range(4):
+            yield (h1 + i * h2) & self._mask
+    
+    def increment(self, key: str) -> None:
+        for row, index in zip(self._rows, self._indexes(key)):
+            if row[index] < 15:
+                row[index] += 1
+        self._additions += 1
+        if self._additions >= self._sample_size:
+            # Aging: halve every counter so old popularity decays
+            for row in self._rows:
+                for i, count in enumerate(row):
+                    row[i] = count >> 1
+            self._additions //= 2
+    
+    def estimate(self, key: str) -> int:
+        return min(row[index] for row, index in zip(self._rows, self._indexes(key)))
+
+class LocalCache:
+    """
+    In-process L1 cache with an entry and byte budget and per-entry TTL
+    
+    policy='lru' evicts the least recently used entry; policy='tinylfu' also
+    refuses to admit a new key that is accessed less often than the entry it
+    would evict. Cached values are shared with callers, not copied.
+    """
+    
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 64 * 1024 * 1024,
+                 ttl: Optional[float] = 60.0, policy: str = 'lru'):
+        if policy not in ('lru', 'tinylfu'):
+            raise ValueError(f"Unsupported local cache policy: {policy}")
+        self.max_entries = max(1, int(max_entries))
+        self.max_bytes = max(1, int(max_bytes))
+        self.ttl = ttl
+        self.policy = policy
+        self._entries: 'OrderedDict[str, Tuple[Any, int, Optional[float], Tuple[str, ...]]]' = OrderedDict()
+        self._tags: Dict[str, set] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._sketch = _FrequencySketch(self.max_entries) if policy == 'tinylfu' else None
+        self._stats = {'hits': 0, 'misses': 0, 'sets': 0, 'evictions': 0,
+                       'expirations': 0, 'rejections': 0, 'invalidations': 0}
+    
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None on a miss or an expired entry"""
+        with self._lock:
+            if self._sketch is not None:
+                self._sketch.increment(key)
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            value, size, expires_at, _ = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._remove_locked(key)
+                self._stats['expirations'] += 1
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return value
+    
+    def set(self, key: str, value: Any, size: int, ttl: Optional[float] = None,
+            tags: Tuple[str, ...] = ()) -> bool:
+        """Store value (size bytes when encoded); ttl is capped by the cache-wide TTL"""
+        if size > self.max_bytes:
+            return False
+        if self.ttl is not None:
+            ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            if key in self._entries:
+                self._remove_locked(key)
+            elif self._sketch is not None:
+                self._sketch.increment(key)
+            while self._entries and (len(self._entries) >= self.max_entries or
+                                     self._bytes + size > self.max_bytes):
+                victim = next(iter(self._entries))
+                if (self._sketch is not None and
+                        self._sketch.estimate(key) <= self._sketch.estimate(victim)):
+                    self._stats['rejections'] += 1
+                    return False
+                self._remove_locked(victim)
+                self._stats['evictions'] += 1
+            self._entries[key] = (value, size, expires_at, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            self._bytes += size
+            self._stats['sets'] += 1
+            return True
+    
+    def delete(self, key: str) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._remove_locked(key)
+    
+    def invalidate_tags(self, tags: Iterator[str]) -> int:
+        """Drop every entry carrying any of tags; returns the number removed"""
+        removed = 0
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    if key in self._entries:
+                        self._remove_locked(key)
+                        removed += 1
+            self._stats['invalidations'] += removed
+        return removed
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self._bytes = 0
+    
+    def _remove_locked(self, key: str) -> None:
+        _, size, _, tags = self._entries.pop(key)
+        self._bytes -= size
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss/eviction counters and current occupancy"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({'entries': len(self._entries), 'bytes': self._bytes,
+                          'policy': self.policy})
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+class _LeaderCancelled(Exception):
+    """Raised to followers when the call they were waiting on was cancelled"""
+
+class SingleFlight:
+    """
+    Collapse concurrent calls that share a key into one execution
+    
+    In-flight calls are tracked as concurrent.futures.Future objects, so threads
+    (via do) and asyncio tasks (via ado) can wait on the same leader. Followers
+    receive share(result) when a share function is given, so callers that
+    mutate their result do not see each other's changes.
+    """
+    
+    def __init__(self, timeout: Optional[float] = None):
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Future] = {}
+        self._stats = {'leaders': 0, 'followers': 0}
+    
+    def _join(self, key: str) -> Tuple[Future, bool]:
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self._stats['followers'] += 1
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            self._stats['leaders'] += 1
+            return future, True
+    
+    def _finish(self, key: str, future: Future) -> None:
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+    
+    def do(self, key: str, fn: Callable[[], Any],
+           share: Optional[Callable[[Any], Any]] = None) -> Any:
+        """Run fn once for all concurrent callers of key and return its result to each"""
+        while True:
+            future, leader = self._join(key)
+            if not leader:
+                try:
+                    result = future.result(self.timeout)
+                except _LeaderCancelled:
+                    continue
+                return share(result) if share is not None else result
+            try:
+                result = fn()
+            except BaseException as e:
+                self._finish(key, future)
+                future.set_exception(e if isinstance(e, Exception) else _LeaderCancelled())
+                raise
+            self._finish(key, future)
+            future.set_result(result)
+            return result
+    
+    async def ado(self, key: str, fn: Callable[[], Any],
+                  share: Optional[Callable[[Any], Any]] = None) -> Any:
+        """Coroutine counterpart of do; fn returns an awaitable"""
+        while True:
+            future, leader = self._join(key)
+            if not leader:
+                try:
+                    # Shield so a cancelled follower cannot cancel the shared future
+                    result = await asyncio.wait_for(
+                        asyncio.shield(asyncio.wrap_future(future)), self.timeout
+                    )
+                except _LeaderCancelled:
+                    continue
+                return share(result) if share is not None else result
+            try:
+                result = await fn()
+            except asyncio.CancelledError:
+                self._finish(key, future)
+                future.set_exception(_LeaderCancelled())
+                raise
+            except BaseException as e:
+                self._finish(key, future)
+                future.set_exception(e if isinstance(e, Exception) else _LeaderCancelled())
+                raise
+            self._finish(key, future)
+            future.set_result(result)
+            return result
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['in_flight'] = len(self._calls)
+        return stats
+
+class _PendingBatch:
+    __slots__ = ('context', 'items', 'full')
+    
+    def __init__(self, context: Any):
+        self.context = context
+        self.items: List[Tuple[Any, Any, Future]] = []
+        self.full = threading.Event()
+
+class MicroBatcher:
+    """
+    Merge compatible calls that arrive within a short window into one batch call
+    
+    The first caller of a group waits up to window seconds (less if max_batch
+    callers join), runs the batch on its own thread and hands every caller the
+    result for its key. run(context, {key: value}) must return a result per key.
+    Callers that asked for the same key each get their own copy of its result.
+    """
+    
+    def __init__(self, run: Callable[[Any, Dict[Any, Any]], Dict[Any, Any]],
+                 window: float = 0.002, max_batch: int = 100):
+        self._run = run
+        self.window = window
+        self.max_batch = max(1, max_batch)
+        self._lock = threading.Lock()
+        self._pending: Dict[Any, _PendingBatch] = {}
+        self._stats = {'batches': 0, 'calls': 0, 'keys': 0}
+    
+    def load(self, group: Any, key: Any, value: Any, context: Any) -> Any:
+        """Queue value under group and block until its batch has run"""
+        future: Future = Future()
+        with self._lock:
+            batch = self._pending.get(group)
+            leader = batch is None
+            if leader:
+                batch = _PendingBatch(context)
+                self._pending[group] = batch
+            batch.items.append((key, value, future))
+            if len(batch.items) >= self.max_batch:
+                del self._pending[group]
+                batch.full.set()
+        if leader:
+            batch.full.wait(self.window)
+            with self._lock:
+                if self._pending.get(group) is batch:
+                    del self._pending[group]
+            self._execute(batch)
+        return future.result()
+    
+    def _execute(self, batch: _PendingBatch) -> None:
+        values: Dict[Any, Any] = {}
+        for key, value, _ in batch.items:
+            values.setdefault(key, value)
+        with self._lock:
+            self._stats['batches'] += 1
+            self._stats['calls'] += len(batch.items)
+            self._stats['keys'] += len(values)
+        try:
+            results = self._run(batch.context, values)
+        except BaseException as e:
+            for _, _, future in batch.items:
+                future.set_exception(e if isinstance(e, Exception) else _LeaderCancelled())
+            raise
+        delivered = set()
+        for key, _, future in batch.items:
+            result = results[key]
+            if key in delivered:
+                result = copy.deepcopy(result)
+            delivered.add(key)
+            future.set_result(result)
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['pending'] = len(self._pending)
+        return stats
+
+class ResponseEnvelope:
+    """
+    Builds response envelopes: status, data, a wall-clock timestamp, server-side
+    latency, the backend name and a request id
+    
+    The constant bytes of the encoded form are prepared once; per response only
+    the timestamp, latency and ids are formatted.
+    """
+    
+    SUCCESS_PREFIX = b'{"status": "success", "data": '
+    
+    def __init__(self):
+        self._ids = itertools.count(1)
+        self._id_prefix = f"{os.getpid():x}-"
+        self._quoted: Dict[Optional[str], bytes] = {None: b'null'}
+    
+    def request_id(self, supplied: Optional[Any] = None) -> str:
+        """Use the client's id when it sent one, otherwise a cheap process-unique id"""
+        if supplied is not None:
+            return str(supplied)
+        return f"{self._id_prefix}{next(self._ids)}"
+    
+    @staticmethod
+    def _latency_ms(started: Optional[float]) -> float:
+        if started is None:
+            return 0.0
+        return round((time.perf_counter() - started) * 1000.0, 3)
+    
+    def success(self, data: Any, from_cache: bool, backend: Optional[str],
+                request_id: Optional[str], started: Optional[float]) -> Dict[str, Any]:
+        return {
+            "status": "success",
+            "data": data,
+            "from_cache": from_cache,
+            "timestamp": str(time.time()),
+            "latency_ms": self._latency_ms(started),
+            "backend": backend,
+            "request_id": request_id
+        }
+    
+    def error(self, error_message: str, backend: Optional[str],
+              request_id: Optional[str], started: Optional[float]) -> Dict[str, Any]:
+        return {
+            "status": "error",
+            "error": error_message,
+            "timestamp": str(time.time()),
+            "latency_ms": self._latency_ms(started),
+            "backend": backend,
+            "request_id": request_id
+        }
+    
+    def _quote(self, value: Optional[str]) -> bytes:
+        quoted = self._quoted.get(value)
+        if quoted is None:
+            quoted = json.dumps(value).encode('utf-8')
+            if len(self._quoted) < 64:  # Backend names repeat; request ids do not
+                self._quoted[value] = quoted
+        return quoted
+    
+    def encode_success(self, payload: bytes, from_cache: bool, backend: Optional[str],
+                       request_id: Optional[str], started: Optional[float]) -> bytes:
+        """Encoded equivalent of success() with payload spliced in as the data"""
+        return b''.join((
+            self.SUCCESS_PREFIX, payload,
+            b', "from_cache": true, "timestamp": "' if from_cache else
+            b', "from_cache": false, "timestamp": "',
+            repr(time.time()).encode('ascii'),
+            b'", "latency_ms": ', repr(self._latency_ms(started)).encode('ascii'),
+            b', "backend": ', self._quote(backend),
+            b', "request_id": ', json.dumps(request_id).encode('utf-8'),
+            b'}'
+        ))
 
 class MCPDatabaseServer:
     """Main MCP Database Server handling local database operations"""
@@ -59,26 +1707,109 @@ class MCPDatabaseServer:
         self.config = config or self._load_default_config()
         self.logger = self._setup_logging()
         self.redis_client = None
+        self.envelope = ResponseEnvelope()
+        self.local_cache: Optional[LocalCache] = None
+        self.single_flight: Optional[SingleFlight] = None
+        self._fill_lock_timeouts = 0
+        self._sqlite_pools: Dict[str, SQLitePool] = {}
+        self._sqlite_writers: Dict[str, SQLiteWriteQueue] = {}
+        self._sqlite_replicas: Dict[str, SQLiteReplica] = {}
+        self._sqlite_detectors: Dict[str, SQLiteChangeDetector] = {}
+        self._connection_pools: Dict[str, ConnectionPool] = {}
+        self._mongo_clients: Dict[str, Any] = {}
+        self._pools_lock = threading.Lock()
+        self._cursor_ids = itertools.count(1)
+        self._executors: Dict[str, ThreadPoolExecutor] = {}
+        self._async_redis_client = None
+        self._async_redis_loop = None
         
         if REDIS_AVAILABLE and self.config.get('redis', {}).get('enabled', False):
             try:
                 self.redis_client = redis.Redis(
                     host=self.config['redis'].get('host', 'localhost'),
                     port=self.config['redis'].get('port', 6379),
-                    decode_responses=True
+                    decode_responses=False  # Cache entries are spliced as raw bytes
                 )
                 self.redis_client.ping()
                 self.logger.info("Redis cache connected")
             except Exception as e:
                 self.logger.warning(f"Redis connection failed: {e}")
                 self.redis_client = None
+        
+        local_config = self.config.get('local_cache', {})
+        self._local_ttl = local_config.get('ttl', 60)
+        if local_config.get('enabled', False):
+            # Per-entry TTLs are computed by the server (see _local_entry_ttl)
+            self.local_cache = LocalCache(
+                max_entries=local_config.get('max_entries', 10000),
+                max_bytes=local_config.get('max_bytes', 64 * 1024 * 1024),
+                ttl=None,
+                policy=local_config.get('policy', 'lru')
+            )
+        
+        revalidation = self.config.get('revalidation', {})
+        self._stale_window = (revalidation.get('stale_ttl', 300)
+                              if revalidation.get('stale_while_revalidate', False) else 0)
+        self._early_refresh_beta = (revalidation.get('beta', 1.0)
+                                    if revalidation.get('early_expiration', False) else 0.0)
+        auto_cache = self.config.get('auto_cache', {})
+        self._auto_cache_backends = set(auto_cache.get('backends', []))
+        self._auto_cache_patterns = [re.compile(pattern, re.IGNORECASE)
+                                     for pattern in auto_cache.get('patterns', [])]
+        
+        self._invalidation_enabled = self.config.get('invalidation', {}).get('enabled', False)
+        self._tag_invalidated_at: Dict[str, float] = {}
+        self._invalidated_entries = 0
+        
+        self._refreshing: set = set()
+        self._refresh_lock = threading.Lock()
+        self._revalidation_stats = {'stale_hits': 0, 'early_refreshes': 0,
+                                    'refreshes': 0, 'refresh_failures': 0}
+        self._validation_stats = {'validated_hits': 0, 'changed_drops': 0}
+        
+        flight_config = self.config.get('single_flight', {})
+        if flight_config.get('enabled', False):
+            self.single_flight = SingleFlight(timeout=flight_config.get('timeout'))
+        
+        self.micro_batcher: Optional[MicroBatcher] = None
+        batching = self.config.get('micro_batching', {})
+        if batching.get('enabled', False):
+            self.micro_batcher = MicroBatcher(
+                self._run_point_batch,
+                window=batching.get('window_ms', 2) / 1000.0,
+                max_batch=batching.get('max_batch', 100)
+            )
+        
+        self._prewarm_pools()
+        
+        self._reaper_stop = threading.Event()
+        self._reaper: Optional[threading.Thread] = None
+        reap_interval = self.config.get('sqlite', {}).get('reap_interval', 60)
+        if reap_interval and reap_interval > 0:
+            self._reaper = threading.Thread(target=self._reap_sqlite_pools, args=(reap_interval,),
+                                            name='mcp-sqlite-reaper', daemon=True)
+            self._reaper.start()
     
     def _load_default_config(self) -> Dict[str, Any]:
         """Load default configuration for local database connections"""
         return {
             'sqlite': {
                 'enabled': True,
-                'db_path': './data/app.db'
+                'db_path': './data/app.db',
+                'pool_size': 4,
+                'idle_timeout': 300,
+                'reap_interval': 60,
+                'pragma_profile': None,
+                'pragmas': {},
+                'in_memory_replica': False,
+                'replica_check_interval': 1.0,
+                'replica_refresh_interval': 0,
+                'cache_validation': False,
+                'validated_cache_ttl': 86400,
+                'group_commit': False,
+                'group_commit_max_batch': 64,
+                'group_commit_max_wait_ms': 1,
+                'executor_workers': 5
             },
             'postgresql': {
                 'enabled': POSTGRESQL_AVAILABLE,
@@ -86,7 +1817,17 @@ class MCPDatabaseServer:
                 'port': 5432,
                 'database': 'mcp_db',
                 'user': 'postgres',
-                'password': 'password'
+                'password': 'password',
+                'pool_min_size': 1,
+                'pool_max_size': 10,
+                'pool_prewarm': True,
+                'max_lifetime': 1800,
+                'validation_interval': 30,
+                'pool_timeout': 30,
+                'server_side_cursors': 'auto',
+                'server_side_row_threshold': 100000,
+                'itersize': 2000,
+                'executor_workers': 10
             },
             'mysql': {
                 'enabled': MYSQL_AVAILABLE,
@@ -94,13 +1835,69 @@ class MCPDatabaseServer:
                 'port': 3306,
                 'database': 'mcp_db',
                 'user': 'root',
-                'password': 'password'
+                'password': 'password',
+                'autocommit': False,
+                'streaming_cursor': False,
+                'pool_min_size': 1,
+                'pool_max_size': 10,
+                'pool_prewarm': True,
+                'max_lifetime': 1800,
+                'validation_interval': 30,
+                'pool_timeout': 30,
+                'executor_workers': 10
             },
             'mongodb': {
                 'enabled': MONGODB_AVAILABLE,
                 'host': 'localhost',
                 'port': 27017,
-                'database': 'mcp_db'
+                'database': 'mcp_db',
+                'max_pool_size': 100,
+                'min_pool_size': 0,
+                'max_idle_time_ms': 60000,
+                'wait_queue_timeout_ms': 10000,
+                'executor_workers': 16
+            },
+            'stdio': {
+                'max_in_flight': 64
+            },
+            'streaming': {
+                'chunk_size': 1000
+            },
+            'local_cache': {
+                'enabled': True,
+                'max_entries': 10000,
+                'max_bytes': 64 * 1024 * 1024,
+                'ttl': 60,
+                'policy': 'lru'
+            },
+            'single_flight': {
+                'enabled': True,
+                'distributed': False,
+                'lock_ttl_ms': 5000,
+                'wait_timeout': 5.0,
+                'poll_interval': 0.05
+            },
+            'bulk_insert': {
+                'chunk_size': 5000
+            },
+            'micro_batching': {
+                'enabled': False,
+                'window_ms': 2,
+                'max_batch': 100
+            },
+            'revalidation': {
+                'stale_while_revalidate': False,
+                'stale_ttl': 300,
+                'early_expiration': True,
+                'beta': 1.0,
+                'executor_workers': 2
+            },
+            'invalidation': {
+                'enabled': True
+            },
+            'auto_cache': {
+                'backends': [],
+                'patterns': []
             },
             'redis': {
                 'enabled': REDIS_AVAILABLE,
@@ -130,78 +1927,1082 @@ class MCPDatabaseServer:
         Main entry point - receives and processes client requests
         Following the pseudocode workflow
         """
+        started = time.perf_counter()
+        request = None
         try:
             # Parse request
             request = self._parse_request(request_data)
             self.logger.info(f"Processing {request.db_type} request: {request.operation}")
             
-            # Check Redis cache first (if enabled)
-            if request.cache_key and self.redis_client:
-                cached_result = self._check_cache(request.cache_key)
-                if cached_result:
-                    self.logger.info("Cache hit - returning cached result")
-                    return self._format_response(cached_result, from_cache=True)
-            
-            # Route to appropriate database handler
-            result = self._route_request(request)
-            
-            # Store in cache if configured
-            if request.cache_key and self.redis_client and result:
-                self._store_in_cache(request.cache_key, result)
+            result, cached, _ = self._process_request(request)
             
             # Format and return response
-            return self._format_response(result)
+            if cached is not None:
+                return self._format_response(cached.data, True, request, started)
+            return self._format_response(result, False, request, started)
             
         except Exception as e:
             self.logger.error(f"Request processing failed: {e}")
-            return self._format_error_response(str(e))
-    
-    def _parse_request(self, request_data: Dict[str, Any]) -> DatabaseRequest:
-        """Parse incoming request data into structured format"""
-        return DatabaseRequest(
-            db_type=request_data.get('db_type', '').lower(),
-            operation=request_data.get('operation', ''),
-            query=request_data.get('query'),
-            parameters=request_data.get('parameters', {}),
-            cache_key=request_data.get('cache_key')
-        )
+            return self._format_error_response(str(e), request, started, request_data)
     
-    def _route_request(self, request: DatabaseRequest) -> Any:
-        """Route request to appropriate database handler based on db_type"""
+    def receive_client_request_raw(self, request_data: Dict[str, Any]) -> bytes:
+        """
+        Same as receive_client_request, but returns the JSON-encoded response.
+        Cache hits splice the stored payload bytes into the envelope without decoding.
+        """
+        started = time.perf_counter()
+        request = None
+        try:
+            request = self._parse_request(request_data)
+            self.logger.info(f"Processing {request.db_type} request: {request.operation}")
+            result, cached, payload = self._process_request(request)
+            if cached is not None:
+                return self._encode_response(cached.payload, True, request, started)
+            if payload is None:
+                payload = json.dumps(result, default=str).encode('utf-8')
+            return self._encode_response(payload, False, request, started)
+        except Exception as e:
+            self.logger.error(f"Request processing failed: {e}")
+            error = self._format_error_response(str(e), request, started, request_data)
+            return json.dumps(error).encode('utf-8')
+    
+    def _process_request(self, request: DatabaseRequest) -> Tuple[Any, Optional[CacheEntry], Optional[bytes]]:
+        """
+        Answer request from the cache or the database
+        
+        Returns (result, cache entry on a hit, result already JSON-encoded when
+        a cache fill produced it).
+        """
+        if request.stream or not (request.cache_key and self._cache_enabled()):
+            return self._materialize(self._route_request(request), request), None, None
+        
+        # Check the cache tiers first
+        cached = self._servable_entry(request, self._lookup_cache(request.cache_key))
+        if cached is not None:
+            self.logger.info("Cache hit - returning cached result")
+            return None, cached, None
+        
+        # Route to appropriate database handler; concurrent misses are coalesced
+        result, payload = self._fetch_coalesced(request)
+        return result, None, payload
+    
+    async def areceive_client_request(self, request_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Asynchronous entry point - same workflow as receive_client_request, but
+        blocking drivers run on bounded per-backend executors and Redis is awaited,
+        so concurrent requests overlap their I/O on one event loop
+        """
+        started = time.perf_counter()
+        request = None
+        try:
+            request = self._parse_request(request_data)
+            self.logger.info(f"Processing {request.db_type} request: {request.operation}")
+            
+            result, cached, _ = await self._aprocess_request(request)
+            if cached is not None:
+                return self._format_response(cached.data, True, request, started)
+            return self._format_response(result, False, request, started)
+            
+        except Exception as e:
+            self.logger.error(f"Request processing failed: {e}")
+            return self._format_error_response(str(e), request, started, request_data)
+    
+    async def areceive_client_request_raw(self, request_data: Dict[str, Any]) -> bytes:
+        """Coroutine counterpart of receive_client_request_raw"""
+        started = time.perf_counter()
+        request = None
+        try:
+            request = self._parse_request(request_data)
+            self.logger.info(f"Processing {request.db_type} request: {request.operation}")
+            result, cached, payload = await self._aprocess_request(request)
+            if cached is not None:
+                return self._encode_response(cached.payload, True, request, started)
+            if payload is None:
+                payload = json.dumps(result, default=str).encode('utf-8')
+            return self._encode_response(payload, False, request, started)
+        except Exception as e:
+            self.logger.error(f"Request processing failed: {e}")
+            error = self._format_error_response(str(e), request, started, request_data)
+            return json.dumps(error).encode('utf-8')
+    
+    def receive_batch_request(self, requests_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Batch entry point - answers a list of requests in one call
+        
+        Cache lookups for the whole batch share one Redis MGET, and the misses
+        run concurrently on their backend's executor. Responses come back in
+        request order, each with its own status.
+        """
+        started = time.perf_counter()
+        requests, responses = self._parse_batch(requests_data, started)
+        keys = self._batch_cache_keys(requests)
+        hits = self._batch_hits(requests, keys, self._lookup_cache_many(list(keys)))
+        self.logger.info(f"Processing batch of {len(requests)} requests ({len(hits)} cache hits)")
+        
+        # Identical cacheable reads in one batch share a single execution
+        futures: Dict[Any, Future] = {}
+        tokens = self._batch_tokens(requests)
+        for index, request in enumerate(requests):
+            if request is None or index in hits:
+                continue
+            token = tokens[index]
+            if token not in futures:
+                futures[token] = self._get_executor(request.db_type).submit(self._fetch_batch_item, request)
+        
+        delivered = set()
+        for index, request in enumerate(requests):
+            if responses[index] is not None:
+                continue
+            if index in hits:
+                responses[index] = self._format_response(hits[index].data, True, request, started)
+                continue
+            try:
+                result = futures[tokens[index]].result()
+            except Exception as e:
+                self.logger.error(f"Batch item {index} failed: {e}")
+                responses[index] = self._format_error_response(str(e), request, started, requests_data[index])
+            else:
+                result = self._batch_result(result, tokens[index], delivered)
+                responses[index] = self._format_response(result, False, request, started)
+        return responses
+    
+    async def areceive_batch_request(self, requests_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Coroutine counterpart of receive_batch_request"""
+        started = time.perf_counter()
+        requests, responses = self._parse_batch(requests_data, started)
+        keys = self._batch_cache_keys(requests)
+        entries = await self._alookup_cache_many(list(keys))
+        stamped = {key: entry for key, entry in entries.items() if entry.stamp is not None}
+        unchanged = {}
+        if stamped:
+            unchanged = await asyncio.get_running_loop().run_in_executor(
+                self._get_executor('sqlite'),
+                lambda: {key: self._entry_unchanged(entry) for key, entry in stamped.items()}
+            )
+        hits = self._batch_hits(requests, keys, entries, unchanged)
+        self.logger.info(f"Processing batch of {len(requests)} requests ({len(hits)} cache hits)")
+        
+        tasks: Dict[Any, asyncio.Task] = {}
+        tokens = self._batch_tokens(requests)
+        for index, request in enumerate(requests):
+            if request is None or index in hits:
+                continue
+            token = tokens[index]
+            if token not in tasks:
+                tasks[token] = asyncio.ensure_future(self._afetch_batch_item(request))
+        if tasks:
+            await asyncio.wait(tasks.values())
+        
+        delivered = set()
+        for index, request in enumerate(requests):
+            if responses[index] is not None:
+                continue
+            if index in hits:
+                responses[index] = self._format_response(hits[index].data, True, request, started)
+                continue
+            task = tasks[tokens[index]]
+            if task.exception() is not None:
+                self.logger.error(f"Batch item {index} failed: {task.exception()}")
+                responses[index] = self._format_error_response(str(task.exception()), request,
+                                                               started, requests_data[index])
+            else:
+                result = self._batch_result(task.result(), tokens[index], delivered)
+                responses[index] = self._format_response(result, False, request, started)
+        return responses
+    
+    def _batch_tokens(self, requests: List[Optional[DatabaseRequest]]) -> List[Any]:
+        """
+        Execution token per batch item: the cache key for cacheable reads, so
+        identical ones run once, and the item's own index for everything else
+        """
+        cache_enabled = self._cache_enabled()
+        return [
+            request.cache_key
+            if (request is not None and cache_enabled and request.cache_key and not request.stream and
+                self._is_read_request(request))
+            else index
+            for index, request in enumerate(requests)
+        ]
+    
+    @staticmethod
+    def _batch_result(result: Any, token: Any, delivered: set) -> Any:
+        """Items after the first that share an execution get their own copy of its result"""
+        if token in delivered:
+            return copy.deepcopy(result)
+        delivered.add(token)
+        return result
+    
+    def _parse_batch(self, requests_data: List[Dict[str, Any]],
+                     started: float) -> Tuple[List[Optional[DatabaseRequest]], List[Optional[Dict[str, Any]]]]:
+        """Parse every batch item; items that fail get their error response up front"""
+        if not isinstance(requests_data, list):
+            raise ValueError("Batch requests must be a list")
+        requests: List[Optional[DatabaseRequest]] = []
+        responses: List[Optional[Dict[str, Any]]] = []
+        for request_data in requests_data:
+            request = None
+            try:
+                if not isinstance(request_data, dict):
+                    raise ValueError("Batch items must be request objects")
+                request = self._parse_request(request_data)
+                if request.db_type not in SUPPORTED_BACKENDS:
+                    raise ValueError(f"Unsupported database type: {request.db_type}")
+            except Exception as e:
+                responses.append(self._format_error_response(str(e), request, started, request_data))
+                requests.append(None)
+                continue
+            requests.append(request)
+            responses.append(None)
+        return requests, responses
+    
+    def _batch_cache_keys(self, requests: List[Optional[DatabaseRequest]]) -> Dict[str, List[int]]:
+        """Map each cache key in the batch to the indexes of the requests that use it"""
+        keys: Dict[str, List[int]] = {}
+        if not self._cache_enabled():
+            return keys
+        for index, request in enumerate(requests):
+            if request is not None and request.cache_key and not request.stream:
+                keys.setdefault(request.cache_key, []).append(index)
+        return keys
+    
+    def _batch_hits(self, requests: List[Optional[DatabaseRequest]], keys: Dict[str, List[int]],
+                    entries: Dict[str, CacheEntry],
+                    unchanged: Optional[Dict[str, Optional[bool]]] = None) -> Dict[int, CacheEntry]:
+        """Servable entries by request index; unchanged holds stamp checks already made"""
+        hits: Dict[int, CacheEntry] = {}
+        for key, indexes in keys.items():
+            entry = entries.get(key)
+            if entry is None:
+                continue
+            checked = self._entry_unchanged(entry) if unchanged is None else unchanged.get(key)
+            entry = self._serve_entry(requests[indexes[0]], entry, checked)
+            if entry is not None:
+                for index in indexes:
+                    hits[index] = entry
+        return hits
+    
+    def _fetch_batch_item(self, request: DatabaseRequest) -> Any:
+        """Answer a batch item that missed the cache"""
+        if request.stream or not (request.cache_key and self._cache_enabled()):
+            return self._materialize(self._route_request(request), request)
+        return self._fetch_coalesced(request)[0]
+    
+    async def _afetch_batch_item(self, request: DatabaseRequest) -> Any:
+        if request.stream or not (request.cache_key and self._cache_enabled()):
+            return await self._aroute_request(request)
+        return (await self._afetch_coalesced(request))[0]
+    
+    async def _aprocess_request(self, request: DatabaseRequest) -> Tuple[Any, Optional[CacheEntry], Optional[bytes]]:
+        if request.stream or not (request.cache_key and self._cache_enabled()):
+            return await self._aroute_request(request), None, None
+        
+        cached = await self._aservable_entry(request, await self._alookup_cache(request.cache_key))
+        if cached is not None:
+            self.logger.info("Cache hit - returning cached result")
+            return None, cached, None
+        
+        result, payload = await self._afetch_coalesced(request)
+        return result, None, payload
+    
+    def _fetch_coalesced(self, request: DatabaseRequest) -> Tuple[Any, Optional[bytes]]:
+        """
+        Run a cache miss once per cache_key, however many callers are waiting on it
+        
+        Returns the result and, when this fill cached it, its JSON payload bytes.
+        """
+        if self.single_flight is None:
+            return self._fetch_and_store(request)
+        return self.single_flight.do(request.cache_key, lambda: self._fetch_and_store(request),
+                                     share=self._share_fetch)
+    
+    @staticmethod
+    def _share_fetch(outcome: Tuple[Any, Optional[bytes]]) -> Tuple[Any, Optional[bytes]]:
+        """A coalesced follower's own copy of the leader's (result, payload)"""
+        result, payload = outcome
+        if payload is not None:
+            return json.loads(payload), payload
+        return copy.deepcopy(result), None
+    
+    def _fetch_and_store(self, request: DatabaseRequest) -> Tuple[Any, Optional[bytes]]:
+        """Execute a cache miss and populate the cache, under a Redis lock when distributed"""
+        lock = self._acquire_fill_lock(request.cache_key)
+        if lock is False:
+            # Another process is filling this key; wait for its result to land in Redis
+            cached = self._wait_for_fill(request.cache_key)
+            if cached is not None:
+                return cached, None
+            lock = self._acquire_fill_lock(request.cache_key)
+        try:
+            if lock:
+                # The previous holder may have filled the key between our miss and the lock
+                cached = self._check_cache(request.cache_key)
+                if cached:
+                    return cached, None
+            return self._execute_and_store(request)
+        finally:
+            if lock:
+                self._release_fill_lock(request.cache_key, lock)
+    
+    def _execute_and_store(self, request: DatabaseRequest) -> Tuple[Any, Optional[bytes]]:
+        """Run the request and cache its result along with how long it took to compute"""
+        started = time.monotonic()
+        # Stamped before the query runs, so a commit racing it leaves the entry looking changed
+        stamp = self._cache_stamp(request)
+        result = self._route_request(request)
+        tags = self._read_tags(request)
+        # A write that landed while this read ran may have been missed by it; do not cache
+        entry = None
+        if result and not self._invalidated_since(tags, started):
+            entry = self._store_in_cache(request.cache_key, result,
+                                         delta=time.monotonic() - started, tags=tags, stamp=stamp)
+        return result, entry.payload if entry is not None else None
+    
+    async def _afetch_coalesced(self, request: DatabaseRequest) -> Tuple[Any, Optional[bytes]]:
+        if self.single_flight is None:
+            return await self._afetch_and_store(request)
+        return await self.single_flight.ado(request.cache_key, lambda: self._afetch_and_store(request),
+                                            share=self._share_fetch)
+    
+    async def _afetch_and_store(self, request: DatabaseRequest) -> Tuple[Any, Optional[bytes]]:
+        lock = await self._aacquire_fill_lock(request.cache_key)
+        if lock is False:
+            cached = await self._await_fill(request.cache_key)
+            if cached is not None:
+                return cached, None
+            lock = await self._aacquire_fill_lock(request.cache_key)
+        try:
+            if lock:
+                cached = await self._acheck_cache(request.cache_key)
+                if cached:
+                    return cached, None
+            started = time.monotonic()
+            stamp = await self._acache_stamp(request)
+            result = await self._aroute_request(request)
+            tags = self._read_tags(request)
+            entry = None
+            if result and not self._invalidated_since(tags, started):
+                entry = await self._astore_in_cache(request.cache_key, result,
+                                                    delta=time.monotonic() - started, tags=tags, stamp=stamp)
+            return result, entry.payload if entry is not None else None
+        finally:
+            if lock:
+                await self._arelease_fill_lock(request.cache_key, lock)
+    
+    def _servable_entry(self, request: DatabaseRequest,
+                        entry: Optional[CacheEntry]) -> Optional[CacheEntry]:
+        """Decide whether a cached entry can answer the request"""
+        if entry is None:
+            return None
+        return self._serve_entry(request, entry, self._entry_unchanged(entry))
+    
+    async def _aservable_entry(self, request: DatabaseRequest,
+                               entry: Optional[CacheEntry]) -> Optional[CacheEntry]:
+        if entry is None:
+            return None
+        return self._serve_entry(request, entry, await self._aentry_unchanged(entry))
+    
+    def _serve_entry(self, request: DatabaseRequest, entry: CacheEntry,
+                     unchanged: Optional[bool]) -> Optional[CacheEntry]:
+        """
+        Serve, refresh or drop an entry given its SQLite stamp check
+        
+        SQLite entries whose stamp still matches the database are served
+        regardless of age, and dropped as soon as it does not. Other fresh
+        entries are served, possibly triggering an XFetch early refresh.
+        Entries past their soft expiry are served only inside the
+        stale-while-revalidate window, and always trigger a background refresh.
+        """
+        if unchanged is not None:
+            if not unchanged:
+                self._drop_cache_entry(request.cache_key)
+                return None
+            self._validation_stats['validated_hits'] += 1
+            return entry
+        now = time.time()
+        if entry.is_fresh(now):
+            if self._early_refresh_beta and entry.should_refresh_early(self._early_refresh_beta, now):
+                self._schedule_refresh(request, 'early_refreshes')
+            return entry
+        if self._stale_window and now < entry.expires_at + self._stale_window:
+            self._schedule_refresh(request, 'stale_hits')
+            return entry
+        return None
+    
+    def _cache_stamp(self, request: DatabaseRequest) -> Optional[List[Any]]:
+        """Change-detection stamp for a SQLite read with cache_validation on, else None"""
+        if request.db_type != 'sqlite' or not self._is_read_request(request):
+            return None
+        stamp = self._sqlite_stamp(request.database)
+        return [request.database] + stamp if stamp is not None else None
+    
+    async def _acache_stamp(self, request: DatabaseRequest) -> Optional[List[Any]]:
+        """_cache_stamp on the sqlite executor; the check stats the file and takes a lock"""
+        if request.db_type != 'sqlite':
+            return None
+        return await asyncio.get_running_loop().run_in_executor(
+            self._get_executor('sqlite'), self._cache_stamp, request
+        )
+    
+    def _sqlite_stamp(self, database: Optional[str]) -> Optional[List[Any]]:
+        """[token, dev, ino, data_version] for the data a read of database would see now"""
+        try:
+            config = self._sqlite_config(database)
+            if not config.get('cache_validation', False):
+                return None
+            pool = self._get_sqlite_pool(database)
+            # Reads served from a replica see the copy, which may trail the file
+            replica = self._get_sqlite_replica(pool, config)
+            if replica is not None:
+                return replica.stamp()
+            detector = self._sqlite_detectors.get(pool.db_path)
+            if detector is None:
+                with self._pools_lock:
+                    detector = self._sqlite_detectors.get(pool.db_path)
+                    if detector is None:
+                        detector = SQLiteChangeDetector(
+                            pool, on_replace=lambda: self._retire_sqlite_pools(pool.db_path)
+                        )
+                        self._sqlite_detectors[pool.db_path] = detector
+            return detector.stamp()
+        except Exception as e:
+            self.logger.warning(f"SQLite change check failed for {database or 'default'}: {e}")
+            return None
+    
+    def _retire_sqlite_pools(self, db_path: str) -> None:
+        """Drop the pools for a replaced file so the next request opens the new one"""
+        with self._pools_lock:
+            retired = [key for key, pool in self._sqlite_pools.items() if pool.db_path == db_path]
+            pools = [self._sqlite_pools.pop(key) for key in retired]
+            writer = self._sqlite_writers.pop(db_path, None)
+        if writer is not None:
+            writer.close()
+        for pool in pools:
+            # Readers still checked out finish on the old file and are closed on release
+            pool.close()
+        self.logger.info(f"SQLite file {db_path} was replaced; reopening its connections")
+    
+    def _entry_unchanged(self, entry: CacheEntry) -> Optional[bool]:
+        """
+        Compare a stamped entry with its database
+        
+        None means the entry cannot be checked here (unstamped, validation
+        off, or stamped through another process's connection) and falls back
+        to TTL expiry.
+        """
+        if entry.stamp is None:
+            return None
+        current = self._sqlite_stamp(entry.stamp[0])
+        if current is None:
+            return None
+        if current[1:3] != entry.stamp[2:4]:
+            return False  # The file was replaced
+        if current[0] != entry.stamp[1]:
+            return None
+        return current[3] == entry.stamp[4]
+    
+    async def _aentry_unchanged(self, entry: CacheEntry) -> Optional[bool]:
+        if entry.stamp is None:
+            return None
+        return await asyncio.get_running_loop().run_in_executor(
+            self._get_executor('sqlite'), self._entry_unchanged, entry
+        )
+    
+    def _drop_cache_entry(self, cache_key: str) -> None:
+        """Remove an entry whose database changed; the Redis delete runs off the request path"""
+        self._validation_stats['changed_drops'] += 1
+        if self.local_cache is not None:
+            self.local_cache.delete(cache_key)
+        if self.redis_client is not None:
+            try:
+                self._get_executor('revalidation').submit(self._delete_cached, cache_key)
+            except RuntimeError:
+                pass  # Executor shut down during close()
+    
+    def _delete_cached(self, cache_key: str) -> None:
+        try:
+            self.redis_client.delete(cache_key)
+        except Exception as e:
+            self.logger.warning(f"Cache delete failed: {e}")
+    
+    def _schedule_refresh(self, request: DatabaseRequest, reason: str) -> None:
+        """Re-run request in the background unless a refresh for its key is already queued"""
+        with self._refresh_lock:
+            self._revalidation_stats[reason] += 1
+            if request.cache_key in self._refreshing:
+                return
+            self._refreshing.add(request.cache_key)
+        try:
+            self._get_executor('revalidation').submit(self._refresh_cache_entry, request)
+        except RuntimeError:
+            # Executor shut down during close()
+            with self._refresh_lock:
+                self._refreshing.discard(request.cache_key)
+    
+    def _refresh_cache_entry(self, request: DatabaseRequest) -> None:
+        try:
+            lock = self._acquire_fill_lock(request.cache_key)
+            if lock is False:
+                return  # Another process is already refreshing this key
+            try:
+                self._execute_and_store(request)
+                self._revalidation_stats['refreshes'] += 1
+            finally:
+                if lock:
+                    self._release_fill_lock(request.cache_key, lock)
+        except Exception as e:
+            self._revalidation_stats['refresh_failures'] += 1
+            self.logger.warning(f"Background cache refresh failed for {request.cache_key}: {e}")
+        finally:
+            with self._refresh_lock:
+                self._refreshing.discard(request.cache_key)
+    
+    def _parse_request(self, request_data: Dict[str, Any]) -> DatabaseRequest:
+        """Parse incoming request data into structured format"""
+        request = DatabaseRequest(
+            db_type=request_data.get('db_type', '').lower(),
+            operation=request_data.get('operation', ''),
+            query=request_data.get('query'),
+            parameters=request_data.get('parameters', {}),
+            cache_key=request_data.get('cache_key'),
+            stream=bool(request_data.get('stream', False)),
+            request_id=self.envelope.request_id(request_data.get('request_id')),
+            chunk_size=request_data.get('chunk_size'),
+            server_side=request_data.get('server_side'),
+            result_format=request_data.get('result_format') or 'dicts',
+            database=request_data.get('database')
+        )
+        if request.result_format not in RESULT_FORMATS:
+            raise ValueError(f"Unsupported result_format: {request.result_format}")
+        if not request.cache_key and self._auto_cache_applies(request):
+            request.cache_key = self._derive_cache_key(request)
+        elif request.cache_key and request.result_format != 'dicts':
+            # The same query shaped differently must not share an entry
+            request.cache_key = f"{request.cache_key}:{request.result_format}"
+        return request
+    
+    def _is_read_request(self, request: DatabaseRequest) -> bool:
+        """True for operations that only read data (SQL SELECT, MongoDB find)"""
+        if request.db_type == 'mongodb':
+            return request.operation == 'find'
+        return (request.operation.lower() == 'select' or
+                (request.query or '').lstrip().lower().startswith('select'))
+    
+    def _auto_cache_applies(self, request: DatabaseRequest) -> bool:
+        """True when config['auto_cache'] enables caching for this read request"""
+        if request.stream or not self._cache_enabled() or not self._is_read_request(request):
+            return False
+        if request.db_type in self._auto_cache_backends:
+            return True
+        query = request.query or ''
+        return any(pattern.search(query) for pattern in self._auto_cache_patterns)
+    
+    def _derive_cache_key(self, request: DatabaseRequest) -> str:
+        """
+        Build a canonical cache key from the backend identity, the normalized
+        query text and the canonicalized parameters
+        """
+        canonical = json.dumps(
+            [request.db_type, self._backend_identity(request.db_type, request.database),
+             request.operation.lower(), normalize_query(request.query or ''),
+             request.parameters] + ([request.result_format] if request.result_format != 'dicts' else []),
+            sort_keys=True, separators=(',', ':'), default=str
+        )
+        digest = hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+        return f"{AUTO_CACHE_KEY_PREFIX}{request.db_type}:{digest}"
+    
+    def _backend_identity(self, db_type: str, database: Optional[str] = None) -> str:
+        """Identify the database a backend points at, so equal queries on different databases differ"""
+        config = self.config.get(db_type, {})
+        if db_type == 'sqlite':
+            return os.path.abspath(self._sqlite_config(database).get('db_path', ''))
+        if db_type == 'mongodb' and config.get('uri'):
+            return f"{config['uri']}/{config.get('database')}"
+        return f"{config.get('host')}:{config.get('port')}/{config.get('database')}"
+    
+    def _route_request(self, request: DatabaseRequest) -> Any:
+        """Route request to appropriate database handler based on db_type"""
+        if self.micro_batcher is not None:
+            lookup = self._point_lookup(request)
+            if lookup is not None:
+                group, value = lookup
+                return self.micro_batcher.load(group, _lookup_key(value), value, request)
+        
         if request.db_type == "sqlite":
-            return self._handle_sqlite(request)
+            result = self._handle_sqlite(request)
         elif request.db_type == "postgresql":
-            return self._handle_postgresql(request)
+            result = self._handle_postgresql(request)
         elif request.db_type == "mysql":
-            return self._handle_mysql(request)
+            result = self._handle_mysql(request)
         elif request.db_type == "mongodb":
-            return self._handle_mongodb(request)
+            result = self._handle_mongodb(request)
         else:
             raise ValueError(f"Unsupported database type: {request.db_type}")
+        
+        # Writes have committed by now; purge cached reads of the tables they touched
+        if self._invalidation_enabled and not self._is_read_request(request):
+            self._invalidate_for_write(request)
+        return result
+    
+    def _point_lookup(self, request: DatabaseRequest) -> Optional[Tuple[Any, Any]]:
+        """(batch group, key value) when request is a point lookup micro-batching can merge"""
+        if request.stream or request.result_format != 'dicts' or not self._is_read_request(request):
+            return None
+        if request.db_type == 'mongodb':
+            params = request.parameters if isinstance(request.parameters, dict) else {}
+            query = params.get('query')
+            if not isinstance(query, dict) or len(query) != 1:
+                return None
+            (field, value), = query.items()
+            if field.startswith('$') or '.' in field or not isinstance(value, _BATCHABLE_TYPES):
+                return None
+            # Rows are matched back by value in Python, which a collection collation would
+            # not agree with for strings; booleans would merge with 0 and 1
+            if isinstance(value, (str, bool)):
+                return None
+            return ('mongodb', params.get('collection', 'default'), field), value
+        
+        params = request.parameters
+        if not isinstance(params, (list, tuple)) or len(params) != 1:
+            return None
+        if not isinstance(params[0], _BATCHABLE_TYPES):
+            return None
+        match = _POINT_LOOKUP_RE.match(request.query or '')
+        if match is None:
+            return None
+        columns = match.group('columns')
+        # Aggregates and DISTINCT would be computed across every merged key
+        if '(' in columns or columns.lstrip().upper().startswith('DISTINCT'):
+            return None
+        return (request.db_type, request.database, normalize_query(request.query)), params[0]
+    
+    def _run_point_batch(self, request: DatabaseRequest, values: Dict[Any, Any]) -> Dict[Any, List[Any]]:
+        """Run merged point lookups as one IN / $in query and split the rows back out per key"""
+        keys = list(values)
+        params = [values[key] for key in keys]
+        if request.db_type == 'mongodb':
+            field = next(iter(request.parameters['query']))
+            batch = DatabaseRequest('mongodb', 'find', request.query, {
+                'collection': request.parameters.get('collection', 'default'),
+                'query': {field: {'$in': params}}
+            })
+            key_of = lambda doc: doc.get(field)
+        else:
+            match = _POINT_LOOKUP_RE.match(request.query)
+            columns, table, key = match.group('columns').strip(), match.group('table'), match.group('key')
+            if columns == '*':
+                # MySQL only accepts a bare * on its own
+                columns = f"{table}.*"
+            placeholder = '?' if request.db_type == 'sqlite' else '%s'
+            # The database says which keys each row matched, with the column's own collation,
+            # padding and type coercion, instead of comparing values in Python
+            flags = ', '.join(f"({key} = {placeholder}) AS {_BATCH_KEY_COLUMN}{index}"
+                              for index in range(len(params)))
+            query = (f"SELECT {columns}, {flags} FROM {table} "
+                     f"WHERE {key} IN ({', '.join([placeholder] * len(params))})")
+            batch = DatabaseRequest(request.db_type, 'select', query, params + params,
+                                    database=request.database)
+            results: Dict[Any, List[Any]] = {key: [] for key in keys}
+            for row in self._route_request(batch):
+                matched = [index for index in range(len(keys))
+                           if row.pop(f"{_BATCH_KEY_COLUMN}{index}")]
+                for position, index in enumerate(matched):
+                    results[keys[index]].append(row if position == 0 else dict(row))
+            return results
+        
+        # MongoDB compares numbers by value (1 matches 1.0) and matches array
+        # elements, so rows go to every key whose value equals the field or one of its items
+        by_value: Dict[Any, List[Any]] = {}
+        for key in keys:
+            by_value.setdefault(values[key], []).append(key)
+        results = {key: [] for key in keys}
+        for row in self._route_request(batch):
+            field_value = key_of(row)
+            candidates = field_value if isinstance(field_value, list) else [field_value]
+            matched = []
+            for candidate in candidates:
+                if isinstance(candidate, (int, float)) and not isinstance(candidate, bool):
+                    for key in by_value.get(candidate, ()):
+                        if key not in matched:
+                            matched.append(key)
+            for position, key in enumerate(matched):
+                results[key].append(row if position == 0 else copy.deepcopy(row))
+        return results
+    
+    async def _aroute_request(self, request: DatabaseRequest) -> Any:
+        """Run the blocking handler for request.db_type on that backend's executor"""
+        if request.db_type not in SUPPORTED_BACKENDS:
+            raise ValueError(f"Unsupported database type: {request.db_type}")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._get_executor(request.db_type),
+            lambda: self._materialize(self._route_request(request), request)
+        )
+    
+    @staticmethod
+    def _materialize(result: Any, request: DatabaseRequest) -> Any:
+        """Flatten a streamed (chunk generator) result into one result of the requested format"""
+        if not isinstance(result, types.GeneratorType):
+            return result
+        rows: List[Any] = []
+        merged = None
+        for chunk in result:
+            if isinstance(chunk, dict):
+                if merged is None:
+                    merged = chunk
+                else:
+                    for values, more in zip(merged['data'], chunk['data']):
+                        values.extend(more)
+            else:
+                rows.extend(chunk)
+        if merged is None and request.result_format == 'columnar' and request.db_type != 'mongodb':
+            return {"columns": [], "data": []}
+        return merged if merged is not None else rows
+    
+    def _fetch_numpy(self, cursor: Any, request: DatabaseRequest) -> Dict[str, Any]:
+        """Read a SELECT into column arrays, encoded so the result caches and travels as JSON"""
+        return encode_arrays(fetch_arrays(cursor, request.db_type, self._chunk_size(request)))
+    
+    def fetch_arrays(self, request_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Run a read request and return its result as {column: numpy array}
+        
+        Goes through the normal cache; typed columns are read-only views over
+        the decoded buffers.
+        """
+        response = self.receive_client_request(dict(request_data, result_format='numpy'))
+        if response['status'] != 'success':
+            raise RuntimeError(response['error'])
+        return decode_arrays(response['data'])
+    
+    def _chunk_size(self, request: DatabaseRequest) -> int:
+        size = request.chunk_size or self.config.get('streaming', {}).get('chunk_size', 1000)
+        return max(1, int(size))
+    
+    def stream_client_request(self, request_data: Dict[str, Any]) -> Iterator[bytes]:
+        """
+        Streaming entry point - yields the result as NDJSON lines
+        
+        Each line but the last is a chunk, {"chunk": n, "data": [rows]}, read with
+        fetchmany so memory stays bounded by the chunk size. The last line is the
+        usual response envelope; its data is {"row_count": ..., "chunks": ...}.
+        """
+        started = time.perf_counter()
+        request = None
+        try:
+            request = self._parse_request(dict(request_data, stream=True))
+            self.logger.info(f"Streaming {request.db_type} request: {request.operation}")
+            result = self._route_request(request)
+        except Exception as e:
+            self.logger.error(f"Request processing failed: {e}")
+            yield self._encode_error_line(str(e), request, started, request_data)
+            return
+        
+        if not isinstance(result, types.GeneratorType):
+            yield self._encode_response(json.dumps(result, default=str).encode('utf-8'),
+                                        False, request, started) + b'\n'
+            return
+        
+        rows = chunks = 0
+        try:
+            for chunk in result:
+                yield self._encode_chunk(chunks, chunk)
+                rows += chunk_row_count(chunk)
+                chunks += 1
+        except Exception as e:
+            self.logger.error(f"Streaming failed after {rows} rows: {e}")
+            yield self._encode_error_line(str(e), request, started, request_data)
+            return
+        finally:
+            result.close()
+        yield self._encode_stream_summary(rows, chunks, request, started)
+    
+    async def astream_client_request(self, request_data: Dict[str, Any]) -> AsyncIterator[bytes]:
+        """Coroutine counterpart of stream_client_request; each fetch runs on the backend executor"""
+        started = time.perf_counter()
+        request = None
+        loop = asyncio.get_running_loop()
+        try:
+            request = self._parse_request(dict(request_data, stream=True))
+            if request.db_type not in SUPPORTED_BACKENDS:
+                raise ValueError(f"Unsupported database type: {request.db_type}")
+            self.logger.info(f"Streaming {request.db_type} request: {request.operation}")
+            executor = self._get_executor(request.db_type)
+            result = await loop.run_in_executor(executor, self._route_request, request)
+        except Exception as e:
+            self.logger.error(f"Request processing failed: {e}")
+            yield self._encode_error_line(str(e), request, started, request_data)
+            return
+        
+        if not isinstance(result, types.GeneratorType):
+            yield self._encode_response(json.dumps(result, default=str).encode('utf-8'),
+                                        False, request, started) + b'\n'
+            return
+        
+        rows = chunks = 0
+        pending = None
+        try:
+            while True:
+                # The generator holds a pooled connection; step it on the backend's threads.
+                # Shielded so a cancellation cannot leave next() running when close() is called
+                pending = loop.run_in_executor(executor, next, result, None)
+                chunk = await asyncio.shield(pending)
+                pending = None
+                if chunk is None:
+                    break
+                yield self._encode_chunk(chunks, chunk)
+                rows += chunk_row_count(chunk)
+                chunks += 1
+        except Exception as e:
+            self.logger.error(f"Streaming failed after {rows} rows: {e}")
+            yield self._encode_error_line(str(e), request, started, request_data)
+            return
+        finally:
+            if pending is not None:
+                await asyncio.wait({pending})
+                if not pending.cancelled():
+                    pending.exception()  # Already reported or superseded by the cancellation
+            await loop.run_in_executor(executor, result.close)
+        yield self._encode_stream_summary(rows, chunks, request, started)
+    
+    @staticmethod
+    def _encode_chunk(index: int, rows: Any) -> bytes:
+        return json.dumps({"chunk": index, "data": rows}, default=str).encode('utf-8') + b'\n'
+    
+    def _encode_stream_summary(self, rows: int, chunks: int, request: DatabaseRequest,
+                               started: float) -> bytes:
+        summary = json.dumps({"row_count": rows, "chunks": chunks}).encode('utf-8')
+        return self._encode_response(summary, False, request, started) + b'\n'
+    
+    def _encode_error_line(self, message: str, request: Optional[DatabaseRequest],
+                           started: float, request_data: Any) -> bytes:
+        error = self._format_error_response(message, request, started, request_data)
+        return json.dumps(error).encode('utf-8') + b'\n'
+    
+    def _get_executor(self, db_type: str) -> ThreadPoolExecutor:
+        """Return the bounded thread pool that runs blocking calls for db_type"""
+        executor = self._executors.get(db_type)
+        if executor is None:
+            with self._pools_lock:
+                executor = self._executors.get(db_type)
+                if executor is None:
+                    workers = self.config.get(db_type, {}).get('executor_workers', 4)
+                    executor = ThreadPoolExecutor(
+                        max_workers=max(1, int(workers)),
+                        thread_name_prefix=f"mcp-{db_type}"
+                    )
+                    self._executors[db_type] = executor
+        return executor
     
     def _handle_sqlite(self, request: DatabaseRequest) -> Any:
         """Handle SQLite database operations"""
         if not self.config['sqlite']['enabled']:
             raise RuntimeError("SQLite not enabled")
         
-        db_path = self.config['sqlite']['db_path']
+        config = self._sqlite_config(request.database)
+        pool = self._get_sqlite_pool(request.database)
+        is_select = (request.operation.lower() == 'select' or
+                     (request.query or '').lower().startswith('select'))
+        if pool.read_only and not is_select:
+            raise ValueError(f"SQLite database {request.database or config['db_path']} is read-only")
         
-        # Ensure directory exists
-        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        if request.operation.lower() == 'bulk_insert':
+            result = self._bulk_insert_sql(request, '?', pool.writer)
+            self._notify_sqlite_replica(pool)
+            return result
         
-        with sqlite3.connect(db_path) as conn:
-            conn.row_factory = sqlite3.Row  # Enable dict-like access
-            cursor = conn.cursor()
-            
-            if request.operation.lower() == 'select' or request.query.lower().startswith('select'):
+        if is_select:
+            replica = self._get_sqlite_replica(pool, config)
+            if replica is not None:
+                # replica.reader() stands in for pool.reader() on every read path below
+                pool = replica
+            if request.result_format == 'numpy':
+                with pool.reader() as conn:
+                    cursor = self._sqlite_cursor(conn, request)
+                    cursor.execute(request.query, request.parameters or [])
+                    return self._fetch_numpy(cursor, request)
+            if request.stream:
+                return self._stream_sqlite(pool, request)
+            with pool.reader() as conn:
+                cursor = self._sqlite_cursor(conn, request)
                 cursor.execute(request.query, request.parameters or [])
-                result = [dict(row) for row in cursor.fetchall()]
-            else:
+                if request.result_format == 'dicts':
+                    return [dict(row) for row in cursor.fetchall()]
+                return shape_rows(cursor_columns(cursor), cursor.fetchall(), request.result_format)
+        
+        writer = self._get_sqlite_writer(pool, config)
+        if writer is not None and not _SQLITE_TRANSACTION_CONTROL_RE.match(request.query):
+            result = writer.submit(request.query, request.parameters or []).result()
+        else:
+            with pool.writer() as conn:
+                cursor = conn.execute(request.query, request.parameters or [])
+                result = {"affected_rows": cursor.rowcount, "lastrowid": cursor.lastrowid}
+        self._notify_sqlite_replica(pool)
+        return result
+    
+    def _stream_sqlite(self, pool: Union[SQLitePool, SQLiteReplica], request: DatabaseRequest) -> Iterator[List[Dict[str, Any]]]:
+        """Yield SELECT results in fetchmany chunks; the reader is held until the generator ends"""
+        size = self._chunk_size(request)
+        with pool.reader() as conn:
+            cursor = self._sqlite_cursor(conn, request)
+            try:
                 cursor.execute(request.query, request.parameters or [])
+                columns = cursor_columns(cursor)
+                for rows in iter_fetchmany(cursor, size):
+                    if request.result_format == 'dicts':
+                        yield [dict(row) for row in rows]
+                    else:
+                        yield shape_rows(columns, rows, request.result_format)
+            finally:
+                cursor.close()
+    
+    @staticmethod
+    def _sqlite_cursor(conn: sqlite3.Connection, request: DatabaseRequest) -> sqlite3.Cursor:
+        """Cursor for a read; other formats than dicts fetch plain tuples instead of sqlite3.Row"""
+        cursor = conn.cursor()
+        if request.result_format != 'dicts':
+            cursor.row_factory = None
+        return cursor
+    
+    def _bulk_insert_sql(self, request: DatabaseRequest, placeholder: str,
+                         connection: Callable[[], Any]) -> Dict[str, Any]:
+        """executemany over chunks of rows, all inside one transaction"""
+        table = _checked_name(request.parameters.get('table'))
+        columns, rows = bulk_rows(request.parameters)
+        query = (f"INSERT INTO {table} ({', '.join(_checked_name(c) for c in columns)}) "
+                 f"VALUES ({', '.join([placeholder] * len(columns))})")
+        started = time.perf_counter()
+        with connection() as conn:
+            cursor = conn.cursor()
+            try:
+                total, chunks = self._write_chunks(request, rows, lambda chunk: cursor.executemany(query, chunk))
+            finally:
+                cursor.close()
+            # The SQLite writer commits on exit; pooled server connections need it explicitly
+            if request.db_type != 'sqlite':
                 conn.commit()
-                result = {"affected_rows": cursor.rowcount, "lastrowid": cursor.lastrowid}
-            
-            return result
+        return self._bulk_report(total, chunks, started)
+    
+    def _write_chunks(self, request: DatabaseRequest, rows: Iterable[Any],
+                      write: Callable[[List[Any]], Any]) -> Tuple[int, List[Dict[str, Any]]]:
+        """Feed rows to write in chunk_size pieces, timing each piece"""
+        size = max(1, int(request.chunk_size or self.config.get('bulk_insert', {}).get('chunk_size', 5000)))
+        total = 0
+        chunks = []
+        for index, chunk in enumerate(iter_chunks(rows, size)):
+            chunk_started = time.perf_counter()
+            write(chunk)
+            elapsed = time.perf_counter() - chunk_started
+            total += len(chunk)
+            chunks.append({
+                "chunk": index,
+                "rows": len(chunk),
+                "seconds": round(elapsed, 6),
+                "rows_per_second": round(len(chunk) / elapsed) if elapsed else None
+            })
+            self.logger.info(f"bulk_insert chunk {index}: {len(chunk)} rows in {elapsed * 1000:.1f} ms")
+        return total, chunks
+    
+    @staticmethod
+    def _bulk_report(total: int, chunks: List[Dict[str, Any]], started: float) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - started
+        return {
+            "inserted_rows": total,
+            "seconds": round(elapsed, 6),
+            "rows_per_second": round(total / elapsed) if elapsed else None,
+            "chunks": chunks
+        }
+    
+    def _get_sqlite_writer(self, pool: SQLitePool, config: Dict[str, Any]) -> Optional[SQLiteWriteQueue]:
+        """Return the group-commit queue for pool's database, or None when group_commit is off"""
+        if not config.get('group_commit', False):
+            return None
+        writer = self._sqlite_writers.get(pool.db_path)
+        if writer is None:
+            with self._pools_lock:
+                writer = self._sqlite_writers.get(pool.db_path)
+                if writer is None:
+                    writer = SQLiteWriteQueue(
+                        pool,
+                        max_batch=config.get('group_commit_max_batch', 64),
+                        max_wait=config.get('group_commit_max_wait_ms', 1) / 1000.0
+                    )
+                    self._sqlite_writers[pool.db_path] = writer
+        return writer
+    
+    def _get_sqlite_replica(self, pool: SQLitePool, config: Dict[str, Any]) -> Optional[SQLiteReplica]:
+        """Return the in-memory replica for pool's database, or None when in_memory_replica is off"""
+        if not config.get('in_memory_replica', False):
+            return None
+        replica = self._sqlite_replicas.get(pool.db_path)
+        if replica is None:
+            with self._pools_lock:
+                replica = self._sqlite_replicas.get(pool.db_path)
+                if replica is None:
+                    replica = SQLiteReplica(
+                        pool,
+                        size=config.get('pool_size', 4),
+                        check_interval=config.get('replica_check_interval', 1.0),
+                        refresh_interval=config.get('replica_refresh_interval', 0),
+                        logger=self.logger
+                    )
+                    self._sqlite_replicas[pool.db_path] = replica
+                    self.logger.info(f"SQLite replica of {pool.db_path} loaded into memory "
+                                     f"in {replica.stats()['last_refresh_ms']} ms")
+        return replica
+    
+    def _notify_sqlite_replica(self, pool: SQLitePool) -> None:
+        replica = self._sqlite_replicas.get(pool.db_path)
+        if replica is not None:
+            replica.notify_write()
+    
+    def _sqlite_config(self, database: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Settings for one SQLite database
+        
+        Without a name this is config['sqlite'] itself; named databases come from
+        config['sqlite']['databases'] and override its keys.
+        """
+        base = self.config['sqlite']
+        if database is None:
+            return base
+        databases = base.get('databases') or {}
+        if database not in databases:
+            raise ValueError(f"Unknown SQLite database: {database}")
+        merged = {key: value for key, value in base.items() if key != 'databases'}
+        merged.update(databases[database])
+        return merged
+    
+    def _get_sqlite_pool(self, database: Optional[str] = None) -> SQLitePool:
+        """Return the connection pool for a configured SQLite database, creating it on first use"""
+        config = self._sqlite_config(database)
+        db_path = config['db_path']
+        read_only = config.get('read_only', False) or config.get('immutable', False)
+        # The same file may be configured both writable and read-only; those need separate pools
+        key = db_path
+        if read_only:
+            key += '?mode=ro&immutable=1' if config.get('immutable', False) else '?mode=ro'
+        pool = self._sqlite_pools.get(key)
+        if pool is None:
+            with self._pools_lock:
+                pool = self._sqlite_pools.get(key)
+                if pool is None:
+                    pragmas = sqlite_pragmas(config)
+                    if read_only:
+                        # Static files: map them into memory and skip journal settings
+                        pragmas = {name: value for name, value in pragmas.items()
+                                   if name not in _WRITE_PRAGMAS}
+                        pragmas.setdefault('mmap_size', config.get('read_only_mmap_size', 268435456))
+                    pool = SQLitePool(
+                        db_path,
+                        size=config.get('pool_size', 4),
+                        idle_timeout=config.get('idle_timeout', 300),
+                        timeout=config.get('timeout', 30.0),
+                        pragmas=pragmas,
+                        read_only=read_only,
+                        immutable=config.get('immutable', False)
+                    )
+                    self._sqlite_pools[key] = pool
+        return pool
     
     def _handle_postgresql(self, request: DatabaseRequest) -> Any:
         """Handle PostgreSQL database operations"""
@@ -211,58 +3012,308 @@ class MCPDatabaseServer:
             raise RuntimeError("psycopg2 library is not available")
         if RealDictCursor is None:
             raise RuntimeError("psycopg2.extras.RealDictCursor is not available. Please install the correct psycopg2 version.")
-        config = self.config['postgresql']
-        conn = psycopg2.connect(
-            host=config['host'],
-            port=config['port'],
-            database=config['database'],
-            user=config['user'],
-            password=config['password']
-        )
-        try:
-            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        if request.operation.lower() == 'bulk_insert':
+            return self._bulk_insert_postgresql(request)
+        is_select = request.operation.lower() == 'select' or request.query.lower().startswith('select')
+        if request.stream and is_select and request.result_format != 'numpy':
+            return self._stream_postgresql(request)
+        with self._get_postgresql_pool().connection() as conn:
+            factory = RealDictCursor if request.result_format == 'dicts' else None
+            if is_select and self._use_server_side_cursor(conn, request):
+                with self._server_side_cursor(conn, factory) as cursor:
+                    cursor.execute(request.query, request.parameters)
+                    if request.result_format == 'numpy':
+                        return self._fetch_numpy(cursor, request)
+                    # Iterating a named cursor fetches itersize rows per round trip
+                    return self._shape_postgresql(cursor, list(cursor), request)
+            with conn.cursor(cursor_factory=factory) as cursor:
                 cursor.execute(request.query, request.parameters)
-                if request.operation.lower() == 'select' or request.query.lower().startswith('select'):
-                    result = [dict(row) for row in cursor.fetchall()]
+                if is_select and request.result_format == 'numpy':
+                    result = self._fetch_numpy(cursor, request)
+                elif is_select:
+                    result = self._shape_postgresql(cursor, cursor.fetchall(), request)
                 else:
                     conn.commit()
                     result = {"affected_rows": cursor.rowcount}
                 return result
-        finally:
-            conn.close()
-    def _handle_mysql(self, request: DatabaseRequest) -> Any:
-        """Handle MySQL database operations"""
-        if not MYSQL_AVAILABLE or not self.config['mysql']['enabled']:
-            raise RuntimeError("MySQL not available or not enabled")
-        config = self.config['mysql']
-        # Only pymysql is supported in import logic above
-        if MYSQL_DRIVER == 'pymysql':
-            try:
-                import pymysql
-            except ImportError:
-                raise RuntimeError("pymysql is not installed but required for MySQL support.")
-            conn = pymysql.connect(
+    
+    def _bulk_insert_postgresql(self, request: DatabaseRequest) -> Dict[str, Any]:
+        """COPY ... FROM STDIN per chunk, committed as one transaction"""
+        table = _checked_name(request.parameters.get('table'))
+        columns, rows = bulk_rows(request.parameters)
+        copy = f"COPY {table} ({', '.join(_checked_name(c) for c in columns)}) FROM STDIN"
+        started = time.perf_counter()
+        with self._get_postgresql_pool().connection() as conn:
+            with conn.cursor() as cursor:
+                def write(chunk: List[Any]) -> None:
+                    buffer = io.StringIO()
+                    for row in chunk:
+                        buffer.write('\t'.join(_copy_field(value) for value in row))
+                        buffer.write('\n')
+                    buffer.seek(0)
+                    cursor.copy_expert(copy, buffer)
+                
+                total, chunks = self._write_chunks(request, rows, write)
+            conn.commit()
+        return self._bulk_report(total, chunks, started)
+    
+    def _stream_postgresql(self, request: DatabaseRequest) -> Iterator[List[Dict[str, Any]]]:
+        """Yield SELECT results in fetchmany chunks; the connection is held until the generator ends"""
+        size = self._chunk_size(request)
+        with self._get_postgresql_pool().connection() as conn:
+            factory = RealDictCursor if request.result_format == 'dicts' else None
+            if self._use_server_side_cursor(conn, request):
+                cursor = self._server_side_cursor(conn, factory)
+            else:
+                cursor = conn.cursor(cursor_factory=factory)
+            with cursor:
+                cursor.execute(request.query, request.parameters)
+                for rows in iter_fetchmany(cursor, size):
+                    yield self._shape_postgresql(cursor, rows, request)
+    
+    @staticmethod
+    def _shape_postgresql(cursor: Any, rows: List[Any], request: DatabaseRequest) -> Any:
+        if request.result_format == 'dicts':
+            return [dict(row) for row in rows]
+        return shape_rows(cursor_columns(cursor), rows, request.result_format)
+    
+    def _server_side_cursor(self, conn: Any, factory: Any = None) -> Any:
+        """
+        Open a named (server-side) cursor; rows stay in the backend until fetched
+        
+        Named cursors live inside the connection's transaction, which the pool
+        rolls back on return.
+        """
+        cursor = conn.cursor(name=f"mcp_cursor_{next(self._cursor_ids)}",
+                             cursor_factory=factory)
+        cursor.itersize = self.config['postgresql'].get('itersize', 2000)
+        return cursor
+    
+    def _use_server_side_cursor(self, conn: Any, request: DatabaseRequest) -> bool:
+        """
+        Decide whether a SELECT should run on a named cursor
+        
+        The request's server_side flag wins; otherwise server_side_cursors is
+        'always', 'never' or 'auto'. 'auto' applies to streamed requests only,
+        asking the planner for its row estimate and comparing it with
+        server_side_row_threshold; other requests would pay an EXPLAIN round
+        trip and then materialize every row anyway.
+        """
+        if request.server_side is not None:
+            return bool(request.server_side)
+        config = self.config['postgresql']
+        mode = config.get('server_side_cursors', 'auto')
+        if mode == 'always':
+            return True
+        if mode != 'auto' or not request.stream:
+            return False
+        estimate = self._estimate_rows(conn, request)
+        return estimate is not None and estimate >= config.get('server_side_row_threshold', 100000)
+    
+    def _estimate_rows(self, conn: Any, request: DatabaseRequest) -> Optional[float]:
+        """Planner row estimate for a SELECT, or None if EXPLAIN fails"""
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("EXPLAIN (FORMAT JSON) " + request.query, request.parameters)
+                plan = cursor.fetchone()[0]
+        except Exception as e:
+            self.logger.warning(f"Row estimate failed, using a client-side cursor: {e}")
+            conn.rollback()
+            return None
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return plan[0]['Plan']['Plan Rows']
+    
+    def _get_postgresql_pool(self) -> ConnectionPool:
+        """Return the shared PostgreSQL connection pool, creating it on first use"""
+        return self._get_connection_pool('postgresql', self._create_postgresql_pool)
+    
+    def _create_postgresql_pool(self) -> ConnectionPool:
+        """Build the PostgreSQL pool from config['postgresql']"""
+        config = self.config['postgresql']
+        
+        def connect():
+            return psycopg2.connect(
                 host=config['host'],
                 port=config['port'],
+                database=config['database'],
                 user=config['user'],
-                password=config['password'],
-                database=config['database']
+                password=config['password']
             )
-        else:
+        
+        validation_interval = config.get('validation_interval', 30)
+        
+        def validate(conn, idle_for: float) -> bool:
+            # A closed flag is free to read; only round-trip when the connection sat idle
+            if conn.closed:
+                return False
+            if idle_for >= validation_interval:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                conn.rollback()
+            return True
+        
+        def reset(conn) -> None:
+            # End any transaction left open by a SELECT or a failed statement
+            conn.rollback()
+        
+        return ConnectionPool(
+            connect,
+            min_size=config.get('pool_min_size', 1),
+            max_size=config.get('pool_max_size', 10),
+            max_lifetime=config.get('max_lifetime', 1800),
+            timeout=config.get('pool_timeout', 30),
+            validate=validate,
+            reset=reset,
+            name='postgresql'
+        )
+    
+    def _get_connection_pool(self, name: str, factory: Callable[[], ConnectionPool]) -> ConnectionPool:
+        """Return the named connection pool, creating it with factory on first use"""
+        pool = self._connection_pools.get(name)
+        if pool is None:
+            with self._pools_lock:
+                pool = self._connection_pools.get(name)
+                if pool is None:
+                    pool = factory()
+                    self._connection_pools[name] = pool
+        return pool
+    
+    def _reap_sqlite_pools(self, interval: float) -> None:
+        """Reaper thread: close SQLite connections, the writer included, idle past idle_timeout"""
+        while not self._reaper_stop.wait(interval):
+            with self._pools_lock:
+                pools = list(self._sqlite_pools.values())
+            for pool in pools:
+                try:
+                    pool.reap_idle()
+                except Exception as e:
+                    self.logger.warning(f"SQLite reaping failed for {pool.db_path}: {e}")
+    
+    def _prewarm_pools(self) -> None:
+        """Open min_size connections for pooled backends that ask for it, and report SQLite PRAGMAs, at startup"""
+        sqlite_config = self.config.get('sqlite', {})
+        if sqlite_config.get('enabled'):
+            for database in [None] + list(sqlite_config.get('databases') or {}):
+                try:
+                    pool = self._get_sqlite_pool(database)
+                    if pool.pragmas:
+                        self._report_sqlite_pragmas(pool, database)
+                    self._get_sqlite_replica(pool, self._sqlite_config(database))
+                except Exception as e:
+                    self.logger.warning(f"SQLite setup failed for {database or 'default'}: {e}")
+        
+        backends = (
+            ('postgresql', 'PostgreSQL', POSTGRESQL_AVAILABLE, self._get_postgresql_pool),
+            ('mysql', 'MySQL', MYSQL_AVAILABLE, self._get_mysql_pool),
+        )
+        for key, label, available, get_pool in backends:
+            config = self.config.get(key, {})
+            if not (available and config.get('enabled') and config.get('pool_prewarm')):
+                continue
+            try:
+                opened = get_pool().warm_up()
+                self.logger.info(f"{label} pool warmed with {opened} connection(s)")
+            except Exception as e:
+                self.logger.warning(f"{label} pool warm-up failed: {e}")
+    
+    def _report_sqlite_pragmas(self, pool: SQLitePool, database: Optional[str] = None) -> None:
+        """Open a connection so the PRAGMAs run, then log what SQLite actually accepted"""
+        with pool.reader():
+            pass
+        profile = self._sqlite_config(database).get('pragma_profile') or 'custom'
+        self.logger.info(f"SQLite PRAGMA profile '{profile}' on {pool.db_path}: {pool.applied_pragmas}")
+        for name, wanted in pool.pragmas.items():
+            actual = pool.applied_pragmas.get(name)
+            if str(actual).lower() != str(wanted).lower():
+                self.logger.warning(f"SQLite PRAGMA {name} requested {wanted} but is {actual}")
+    
+    def _handle_mysql(self, request: DatabaseRequest) -> Any:
+        """Handle MySQL database operations"""
+        if not MYSQL_AVAILABLE or not self.config['mysql']['enabled']:
+            raise RuntimeError("MySQL not available or not enabled")
+        if MYSQL_DRIVER != 'pymysql':
             raise RuntimeError("No suitable MySQL driver found. Only 'pymysql' is supported in this configuration.")
-        try:
-            with conn.cursor() as cursor:
+        config = self.config['mysql']
+        pool = self._get_mysql_pool()
+        if request.operation.lower() == 'bulk_insert':
+            return self._bulk_insert_sql(request, '%s', pool.connection)
+        is_select = request.operation.lower() == 'select' or request.query.lower().startswith('select')
+        if request.stream and is_select and request.result_format != 'numpy':
+            return self._stream_mysql(pool, request)
+        # Unbuffered cursors hand rows over as they arrive instead of buffering the whole result
+        streaming = config.get('streaming_cursor', False)
+        with pool.connection() as conn:
+            if _SESSION_STATEMENT_RE.match(request.query or ''):
+                # Session state (variables, current schema, locks, temp tables) must not
+                # leak into the next checkout, so this connection is closed on release
+                pool.retire(conn)
+            cursor_class = pymysql.cursors.SSCursor if streaming else None
+            with conn.cursor(cursor_class) as cursor:
                 cursor.execute(request.query, request.parameters)
-                if request.operation.lower() == 'select' or request.query.lower().startswith('select'):
-                    columns = [desc[0] for desc in cursor.description]
-                    rows = cursor.fetchall()
-                    result = [dict(zip(columns, row)) for row in rows]
+                if is_select and request.result_format == 'numpy':
+                    result = self._fetch_numpy(cursor, request)
+                elif is_select:
+                    rows = list(cursor) if streaming else cursor.fetchall()
+                    result = shape_rows(cursor_columns(cursor), rows, request.result_format)
                 else:
                     conn.commit()
                     result = {"affected_rows": cursor.rowcount}
                 return result
-        finally:
-            conn.close()
+    
+    def _stream_mysql(self, pool: ConnectionPool, request: DatabaseRequest) -> Iterator[List[Dict[str, Any]]]:
+        """Yield SELECT results in chunks read from an unbuffered SSCursor"""
+        size = self._chunk_size(request)
+        with pool.connection() as conn:
+            with conn.cursor(pymysql.cursors.SSCursor) as cursor:
+                cursor.execute(request.query, request.parameters)
+                columns = cursor_columns(cursor)
+                for rows in iter_fetchmany(cursor, size):
+                    yield shape_rows(columns, rows, request.result_format)
+    
+    def _get_mysql_pool(self) -> ConnectionPool:
+        """Return the shared MySQL connection pool, creating it on first use"""
+        return self._get_connection_pool('mysql', self._create_mysql_pool)
+    
+    def _create_mysql_pool(self) -> ConnectionPool:
+        """Build the MySQL pool from config['mysql']; connections are reset on return"""
+        config = self.config['mysql']
+        autocommit = config.get('autocommit', False)
+        
+        def connect():
+            return pymysql.connect(
+                host=config['host'],
+                port=config['port'],
+                user=config['user'],
+                password=config['password'],
+                database=config['database'],
+                autocommit=autocommit
+            )
+        
+        validation_interval = config.get('validation_interval', 30)
+        
+        def validate(conn, idle_for: float) -> bool:
+            if not conn.open:
+                return False
+            if idle_for >= validation_interval:
+                conn.ping(reconnect=False)
+            return True
+        
+        def reset(conn) -> None:
+            conn.rollback()
+            if conn.get_autocommit() != autocommit:
+                conn.autocommit(autocommit)
+        
+        return ConnectionPool(
+            connect,
+            min_size=config.get('pool_min_size', 1),
+            max_size=config.get('pool_max_size', 10),
+            max_lifetime=config.get('max_lifetime', 1800),
+            timeout=config.get('pool_timeout', 30),
+            validate=validate,
+            reset=reset,
+            name='mysql'
+        )
     
     def _handle_mongodb(self, request: DatabaseRequest) -> Any:
         """Handle MongoDB database operations"""
@@ -271,91 +3322,913 @@ class MCPDatabaseServer:
         if 'pymongo' not in globals() or pymongo is None:
             raise RuntimeError("pymongo library is not available")
         config = self.config['mongodb']
-        client = pymongo.MongoClient(f"mongodb://{config['host']}:{config['port']}")
-        try:
-            db = client[config['database']]
-            # Simple operation routing for MongoDB
-            if request.operation == 'find':
-                collection = db[request.parameters.get('collection', 'default')]
-                query = request.parameters.get('query', {})
-                result = list(collection.find(query))
-                # Convert ObjectId to string for JSON serialization
-                for doc in result:
+        db = self._get_mongo_client()[config['database']]
+        # Simple operation routing for MongoDB
+        if request.operation == 'find':
+            collection = db[request.parameters.get('collection', 'default')]
+            query = request.parameters.get('query', {})
+            if request.stream:
+                return self._stream_mongodb(collection, query, request)
+            result = list(collection.find(query))
+            # Convert ObjectId to string for JSON serialization
+            for doc in result:
+                if '_id' in doc:
+                    doc['_id'] = str(doc['_id'])
+            return result
+        elif request.operation == 'bulk_insert':
+            return self._bulk_insert_mongodb(db[request.parameters.get('collection', 'default')], request)
+        elif request.operation == 'insert':
+            collection = db[request.parameters.get('collection', 'default')]
+            document = request.parameters.get('document', {})
+            result = collection.insert_one(document)
+            return {"inserted_id": str(result.inserted_id)}
+        elif request.operation == 'update':
+            collection = db[request.parameters.get('collection', 'default')]
+            query = request.parameters.get('query', {})
+            update = request.parameters.get('update', {})
+            result = collection.update_many(query, update)
+            return {"matched_count": result.matched_count, "modified_count": result.modified_count}
+        elif request.operation == 'delete':
+            collection = db[request.parameters.get('collection', 'default')]
+            query = request.parameters.get('query', {})
+            result = collection.delete_many(query)
+            return {"deleted_count": result.deleted_count}
+        else:
+            raise ValueError(f"Unsupported MongoDB operation: {request.operation}")
+    
+    def _stream_mongodb(self, collection: Any, query: Dict[str, Any],
+                        request: DatabaseRequest) -> Iterator[List[Dict[str, Any]]]:
+        """Yield find() results in chunks that match the server-side batch size"""
+        size = self._chunk_size(request)
+        cursor = collection.find(query, batch_size=size)
+        try:
+            while True:
+                docs = list(itertools.islice(cursor, size))
+                if not docs:
+                    return
+                for doc in docs:
                     if '_id' in doc:
                         doc['_id'] = str(doc['_id'])
-                return result
-            elif request.operation == 'insert':
-                collection = db[request.parameters.get('collection', 'default')]
-                document = request.parameters.get('document', {})
-                result = collection.insert_one(document)
-                return {"inserted_id": str(result.inserted_id)}
-            elif request.operation == 'update':
-                collection = db[request.parameters.get('collection', 'default')]
-                query = request.parameters.get('query', {})
-                update = request.parameters.get('update', {})
-                result = collection.update_many(query, update)
-                return {"matched_count": result.matched_count, "modified_count": result.modified_count}
-            elif request.operation == 'delete':
-                collection = db[request.parameters.get('collection', 'default')]
-                query = request.parameters.get('query', {})
-                result = collection.delete_many(query)
-                return {"deleted_count": result.deleted_count}
-            else:
-                raise ValueError(f"Unsupported MongoDB operation: {request.operation}")
+                yield docs
         finally:
-            client.close()
+            cursor.close()
     
-    def _check_cache(self, cache_key: str) -> Optional[Any]:
-        """Check Redis cache for cached result"""
+    def _bulk_insert_mongodb(self, collection: Any, request: DatabaseRequest) -> Dict[str, Any]:
+        """insert_many(ordered=False) per chunk, so one bad document does not stop the rest"""
+        documents = request.parameters.get('documents')
+        if documents is None:
+            columns, rows = bulk_rows(request.parameters)
+            documents = (dict(zip(columns, row)) for row in rows)
+        started = time.perf_counter()
+        
+        def write(chunk: List[Any]) -> None:
+            collection.insert_many(chunk, ordered=False)
+        
+        total, chunks = self._write_chunks(request, documents, write)
+        return self._bulk_report(total, chunks, started)
+    
+    def _get_mongo_client(self) -> Any:
+        """Return the long-lived MongoClient for the configured deployment, creating it on first use"""
+        config = self.config['mongodb']
+        uri = config.get('uri') or f"mongodb://{config['host']}:{config['port']}"
+        client = self._mongo_clients.get(uri)
+        if client is None:
+            with self._pools_lock:
+                client = self._mongo_clients.get(uri)
+                if client is None:
+                    # pymongo pools connections and monitors servers internally; keep it alive
+                    client = pymongo.MongoClient(
+                        uri,
+                        maxPoolSize=config.get('max_pool_size', 100),
+                        minPoolSize=config.get('min_pool_size', 0),
+                        maxIdleTimeMS=config.get('max_idle_time_ms', 60000),
+                        waitQueueTimeoutMS=config.get('wait_queue_timeout_ms', 10000)
+                    )
+                    self._mongo_clients[uri] = client
+        return client
+    
+    def _tag_scope(self, request: DatabaseRequest) -> str:
+        return f"{request.db_type}:{self._backend_identity(request.db_type, request.database)}"
+    
+    def _read_tags(self, request: DatabaseRequest) -> Tuple[str, ...]:
+        """Tags for a cached read: one per table it reads ('?' when unknown) plus the backend-wide '*'"""
+        if not self._invalidation_enabled:
+            return ()
+        scope = self._tag_scope(request)
+        if request.db_type == 'mongodb':
+            tables = {(request.parameters or {}).get('collection', 'default')}
+        else:
+            tables = extract_read_tables(request.query or '')
+        if not tables:
+            return (f"{scope}:?", f"{scope}:*")
+        return tuple(f"{scope}:{table}" for table in sorted(tables)) + (f"{scope}:*",)
+    
+    def _write_tags(self, request: DatabaseRequest) -> Tuple[str, ...]:
+        """Tags a write invalidates; writes to unknown tables purge the whole backend"""
+        scope = self._tag_scope(request)
+        if request.db_type == 'mongodb':
+            tables = {(request.parameters or {}).get('collection', 'default')}
+        elif request.operation.lower() == 'bulk_insert':
+            tables = {_table_name(request.parameters.get('table') or '')}
+        else:
+            query = request.query or ''
+            if _NON_MUTATING_RE.match(query):
+                return ()
+            tables = extract_write_tables(query)
+            if not tables:
+                return (f"{scope}:*",)
+        # Reads whose tables could not be extracted are purged by every write
+        return tuple(f"{scope}:{table}" for table in sorted(tables)) + (f"{scope}:?",)
+    
+    def _invalidate_for_write(self, request: DatabaseRequest) -> None:
+        tags = self._write_tags(request)
+        if tags:
+            self.invalidate_tags(tags)
+    
+    def invalidate_tags(self, tags: Tuple[str, ...]) -> int:
+        """Purge L1 and Redis entries tagged with any of tags; returns the number removed"""
+        now = time.monotonic()
+        with self._refresh_lock:
+            for tag in tags:
+                self._tag_invalidated_at[tag] = now
+        removed = 0
+        if self.local_cache is not None:
+            removed += self.local_cache.invalidate_tags(tags)
+        if self.redis_client is not None:
+            try:
+                removed += self.redis_client.eval(
+                    _PURGE_TAGS_SCRIPT, len(tags), *(CACHE_TAG_PREFIX + tag for tag in tags), time.time()
+                )
+            except Exception as e:
+                self.logger.warning(f"Cache invalidation failed: {e}")
+        self._invalidated_entries += removed
+        if removed:
+            self.logger.debug(f"Invalidated {removed} cache entries for {', '.join(tags)}")
+        return removed
+    
+    def _invalidated_since(self, tags: Tuple[str, ...], started: float) -> bool:
+        """True if a write purged any of tags after a read that started at started"""
+        with self._refresh_lock:
+            return any(self._tag_invalidated_at.get(tag, 0.0) >= started for tag in tags)
+    
+    def _cache_enabled(self) -> bool:
+        """True when at least one cache tier (in-process or Redis) is available"""
+        return self.local_cache is not None or self.redis_client is not None
+    
+    def _redis_ttl(self) -> int:
+        return self.config['redis'].get('ttl', 3600)
+    
+    def _soft_ttl(self) -> float:
+        """Seconds a cached result is considered fresh"""
+        return self._redis_ttl() if self.redis_client is not None else self._local_ttl
+    
+    def _local_entry_ttl(self, entry: CacheEntry, pttl: Optional[int] = None) -> float:
+        """How long the in-process copy of entry may live, stale window included"""
+        remaining = max(0.0, entry.expires_at - time.time()) + self._stale_window
+        if entry.stamp is not None:
+            remaining = max(remaining, self._validated_ttl(entry.stamp))
+        if self.redis_client is None:
+            return remaining
+        # L1 entries never outlive the Redis copy they shadow
+        ttl = min(self._local_ttl, remaining)
+        if pttl is not None and pttl >= 0:
+            ttl = min(ttl, pttl / 1000.0)
+        return ttl
+    
+    def _lookup_cache(self, cache_key: str) -> Optional[CacheEntry]:
+        """Return the cached entry from the in-process cache or Redis, fresh or not"""
+        if self.local_cache is not None:
+            entry = self.local_cache.get(cache_key)
+            if entry is not None:
+                return entry
+        
         if not self.redis_client:
             return None
         
         try:
-            cached_data = self.redis_client.get(cache_key)
+            # GET and PTTL share one round trip; the TTL bounds the L1 copy
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.get(cache_key)
+            pipe.pttl(cache_key)
+            cached_data, pttl = pipe.execute()
             if cached_data:
-                return json.loads(cached_data)
+                entry = CacheEntry.decode(cached_data)
+                self._fill_local_cache(cache_key, entry, pttl)
+                return entry
         except Exception as e:
             self.logger.warning(f"Cache read failed: {e}")
         
         return None
     
-    def _store_in_cache(self, cache_key: str, data: Any) -> None:
-        """Store result in Redis cache with TTL"""
+    def _lookup_cache_many(self, cache_keys: List[str]) -> Dict[str, CacheEntry]:
+        """Look up several keys at once: L1 first, then one Redis MGET for the rest"""
+        found: Dict[str, CacheEntry] = {}
+        missing = []
+        for cache_key in cache_keys:
+            entry = self.local_cache.get(cache_key) if self.local_cache is not None else None
+            if entry is not None:
+                found[cache_key] = entry
+            else:
+                missing.append(cache_key)
+        if not missing or not self.redis_client:
+            return found
+        
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.mget(missing)
+            for cache_key in missing:
+                pipe.pttl(cache_key)
+            replies = pipe.execute()
+            self._collect_many(missing, replies[0], replies[1:], found)
+        except Exception as e:
+            self.logger.warning(f"Cache read failed: {e}")
+        return found
+    
+    def _collect_many(self, cache_keys: List[str], values: List[Optional[bytes]],
+                      pttls: List[Optional[int]], found: Dict[str, CacheEntry]) -> None:
+        for cache_key, cached_data, pttl in zip(cache_keys, values, pttls):
+            if cached_data:
+                entry = CacheEntry.decode(cached_data)
+                self._fill_local_cache(cache_key, entry, pttl)
+                found[cache_key] = entry
+    
+    def _check_cache(self, cache_key: str) -> Optional[Any]:
+        """Check the in-process cache, then Redis, for a fresh cached result"""
+        entry = self._lookup_cache(cache_key)
+        if entry is not None and self._entry_usable(entry):
+            return entry.data
+        return None
+    
+    def _entry_usable(self, entry: CacheEntry) -> bool:
+        """Fresh by TTL, or by its SQLite stamp when it has a checkable one"""
+        unchanged = self._entry_unchanged(entry)
+        return entry.is_fresh() if unchanged is None else unchanged
+    
+    def _fill_local_cache(self, cache_key: str, entry: CacheEntry, pttl: Optional[int]) -> None:
+        """Copy a Redis hit into the in-process cache without outliving the Redis entry"""
+        if self.local_cache is None or pttl is None or pttl == -2:
+            return
+        self.local_cache.set(cache_key, entry, entry.size, self._local_entry_ttl(entry, pttl))
+    
+    def _new_cache_entry(self, data: Any, delta: float,
+                         stamp: Optional[List[Any]] = None) -> Tuple[CacheEntry, bytes]:
+        entry = CacheEntry.from_data(data, time.time() + self._soft_ttl(), delta, stamp)
+        return entry, entry.encode()
+    
+    def _validated_ttl(self, stamp: List[Any]) -> float:
+        """How long a stamped entry may be kept while its database stays unchanged"""
+        try:
+            return self._sqlite_config(stamp[0]).get('validated_cache_ttl', 86400)
+        except ValueError:
+            return 0.0
+    
+    def _storage_ttl(self, stamp: Optional[List[Any]] = None) -> int:
+        """Redis TTL: the fresh period plus the stale-while-revalidate window"""
+        ttl = self._soft_ttl() + self._stale_window
+        if stamp is not None:
+            ttl = max(ttl, self._validated_ttl(stamp))
+        return int(math.ceil(ttl))
+    
+    def _store_in_cache(self, cache_key: str, data: Any, delta: float = 0.0,
+                        tags: Tuple[str, ...] = (), stamp: Optional[List[Any]] = None) -> Optional[CacheEntry]:
+        """
+        Store result in the in-process cache and in Redis with TTL, tagged by table
+        
+        Returns the new entry, whose payload callers can reuse, or None if the
+        result could not be encoded.
+        """
+        try:
+            entry, encoded = self._new_cache_entry(data, delta, stamp)
+        except Exception as e:
+            self.logger.warning(f"Cache write failed: {e}")
+            return None
+        
+        if self.local_cache is not None:
+            self.local_cache.set(cache_key, entry, entry.size, self._local_entry_ttl(entry), tags)
+        
         if not self.redis_client:
+            return entry
+        
+        try:
+            ttl = self._storage_ttl(stamp)
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.setex(cache_key, ttl, encoded)
+            if tags:
+                self._tag_entry(pipe, cache_key, ttl, tags)
+            pipe.execute()
+            self.logger.debug(f"Data cached with key: {cache_key}")
+        except Exception as e:
+            self.logger.warning(f"Cache write failed: {e}")
+        return entry
+    
+    @staticmethod
+    def _tag_entry(pipe: Any, cache_key: str, ttl: int, tags: Tuple[str, ...]) -> None:
+        """Queue cache_key's tag set updates; each fill also prunes members that have expired"""
+        now = time.time()
+        pipe.eval(_TAG_ENTRY_SCRIPT, len(tags), *(CACHE_TAG_PREFIX + tag for tag in tags),
+                  cache_key, now + ttl, now)
+    
+    def _distributed_fill(self) -> bool:
+        return (self.redis_client is not None and
+                self.config.get('single_flight', {}).get('distributed', False))
+    
+    def _acquire_fill_lock(self, cache_key: str) -> Union[str, bool, None]:
+        """
+        Try to take the cross-process fill lock for cache_key
+        
+        Returns the lock token when acquired, False when another process holds it,
+        and None when distributed single-flight is off or Redis is unreachable.
+        """
+        if not self._distributed_fill():
+            return None
+        token = f"{os.getpid()}:{threading.get_ident()}:{time.monotonic_ns()}"
+        ttl_ms = self.config['single_flight'].get('lock_ttl_ms', 5000)
+        try:
+            if self.redis_client.set(FILL_LOCK_PREFIX + cache_key, token, nx=True, px=ttl_ms):
+                return token
+            return False
+        except Exception as e:
+            self.logger.warning(f"Cache fill lock failed: {e}")
+            return None
+    
+    def _release_fill_lock(self, cache_key: str, token: str) -> None:
+        try:
+            self.redis_client.eval(_RELEASE_LOCK_SCRIPT, 1, FILL_LOCK_PREFIX + cache_key, token)
+        except Exception as e:
+            self.logger.warning(f"Cache fill lock release failed: {e}")
+    
+    def _wait_for_fill(self, cache_key: str) -> Optional[Any]:
+        """Poll Redis until another process fills cache_key, its lock lapses, or we time out"""
+        config = self.config['single_flight']
+        deadline = time.monotonic() + config.get('wait_timeout', 5.0)
+        interval = config.get('poll_interval', 0.05)
+        while time.monotonic() < deadline:
+            time.sleep(interval)
+            cached = self._check_cache(cache_key)
+            if cached:
+                return cached
+            try:
+                if not self.redis_client.exists(FILL_LOCK_PREFIX + cache_key):
+                    return None
+            except Exception:
+                return None
+        self._fill_lock_timeouts += 1
+        return None
+    
+    async def _aacquire_fill_lock(self, cache_key: str) -> Union[str, bool, None]:
+        if not self._distributed_fill():
+            return None
+        client = self._get_async_redis()
+        if client is None:
+            return await asyncio.get_running_loop().run_in_executor(
+                None, self._acquire_fill_lock, cache_key
+            )
+        token = f"{os.getpid()}:{id(asyncio.current_task())}:{time.monotonic_ns()}"
+        ttl_ms = self.config['single_flight'].get('lock_ttl_ms', 5000)
+        try:
+            if await client.set(FILL_LOCK_PREFIX + cache_key, token, nx=True, px=ttl_ms):
+                return token
+            return False
+        except Exception as e:
+            self.logger.warning(f"Cache fill lock failed: {e}")
+            return None
+    
+    async def _arelease_fill_lock(self, cache_key: str, token: str) -> None:
+        client = self._get_async_redis()
+        if client is None:
+            await asyncio.get_running_loop().run_in_executor(
+                None, self._release_fill_lock, cache_key, token
+            )
             return
+        try:
+            await client.eval(_RELEASE_LOCK_SCRIPT, 1, FILL_LOCK_PREFIX + cache_key, token)
+        except Exception as e:
+            self.logger.warning(f"Cache fill lock release failed: {e}")
+    
+    async def _await_fill(self, cache_key: str) -> Optional[Any]:
+        client = self._get_async_redis()
+        if client is None:
+            return await asyncio.get_running_loop().run_in_executor(
+                None, self._wait_for_fill, cache_key
+            )
+        config = self.config['single_flight']
+        deadline = time.monotonic() + config.get('wait_timeout', 5.0)
+        interval = config.get('poll_interval', 0.05)
+        while time.monotonic() < deadline:
+            await asyncio.sleep(interval)
+            cached = await self._acheck_cache(cache_key)
+            if cached:
+                return cached
+            try:
+                if not await client.exists(FILL_LOCK_PREFIX + cache_key):
+                    return None
+            except Exception:
+                return None
+        self._fill_lock_timeouts += 1
+        return None
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Return counters for the in-process cache tier, request coalescing and revalidation"""
+        single_flight = self.single_flight.stats() if self.single_flight is not None else None
+        if single_flight is not None:
+            single_flight['fill_lock_timeouts'] = self._fill_lock_timeouts
+        return {
+            'local': self.local_cache.stats() if self.local_cache is not None else None,
+            'redis': {'enabled': self.redis_client is not None},
+            'single_flight': single_flight,
+            'micro_batching': self.micro_batcher.stats() if self.micro_batcher is not None else None,
+            'revalidation': dict(self._revalidation_stats),
+            'sqlite_validation': dict(self._validation_stats),
+            'invalidated_entries': self._invalidated_entries
+        }
+    
+    def _get_async_redis(self) -> Optional[Any]:
+        """Return an asyncio Redis client bound to the running event loop"""
+        if redis_asyncio is None or not self.redis_client:
+            return None
+        loop = asyncio.get_running_loop()
+        if self._async_redis_client is None or self._async_redis_loop is not loop:
+            # asyncio clients are tied to the loop that created their connections
+            self._async_redis_client = redis_asyncio.Redis(
+                host=self.config['redis'].get('host', 'localhost'),
+                port=self.config['redis'].get('port', 6379),
+                decode_responses=False  # Cache entries are spliced as raw bytes
+            )
+            self._async_redis_loop = loop
+        return self._async_redis_client
+    
+    async def _alookup_cache(self, cache_key: str) -> Optional[CacheEntry]:
+        """Coroutine counterpart of _lookup_cache"""
+        if self.local_cache is not None:
+            entry = self.local_cache.get(cache_key)
+            if entry is not None:
+                return entry
+        
+        if not self.redis_client:
+            return None
+        
+        client = self._get_async_redis()
+        if client is None:
+            return await asyncio.get_running_loop().run_in_executor(
+                None, self._lookup_cache, cache_key
+            )
+        
+        try:
+            pipe = client.pipeline(transaction=False)
+            pipe.get(cache_key)
+            pipe.pttl(cache_key)
+            cached_data, pttl = await pipe.execute()
+            if cached_data:
+                entry = CacheEntry.decode(cached_data)
+                self._fill_local_cache(cache_key, entry, pttl)
+                return entry
+        except Exception as e:
+            self.logger.warning(f"Cache read failed: {e}")
+        
+        return None
+    
+    async def _alookup_cache_many(self, cache_keys: List[str]) -> Dict[str, CacheEntry]:
+        """Coroutine counterpart of _lookup_cache_many"""
+        if not cache_keys:
+            return {}
+        client = self._get_async_redis() if self.redis_client else None
+        if self.redis_client and client is None:
+            return await asyncio.get_running_loop().run_in_executor(
+                None, self._lookup_cache_many, cache_keys
+            )
+        
+        found: Dict[str, CacheEntry] = {}
+        missing = []
+        for cache_key in cache_keys:
+            entry = self.local_cache.get(cache_key) if self.local_cache is not None else None
+            if entry is not None:
+                found[cache_key] = entry
+            else:
+                missing.append(cache_key)
+        if not missing or client is None:
+            return found
         
         try:
-            ttl = self.config['redis'].get('ttl', 3600)
-            self.redis_client.setex(
-                cache_key,
-                ttl,
-                json.dumps(data, default=str)  # default=str handles datetime, ObjectId, etc.
+            pipe = client.pipeline(transaction=False)
+            pipe.mget(missing)
+            for cache_key in missing:
+                pipe.pttl(cache_key)
+            replies = await pipe.execute()
+            self._collect_many(missing, replies[0], replies[1:], found)
+        except Exception as e:
+            self.logger.warning(f"Cache read failed: {e}")
+        return found
+    
+    async def _acheck_cache(self, cache_key: str) -> Optional[Any]:
+        """Check the in-process cache, then Redis, without blocking the event loop"""
+        entry = await self._alookup_cache(cache_key)
+        if entry is None:
+            return None
+        unchanged = await self._aentry_unchanged(entry)
+        if entry.is_fresh() if unchanged is None else unchanged:
+            return entry.data
+        return None
+    
+    async def _astore_in_cache(self, cache_key: str, data: Any, delta: float = 0.0,
+                               tags: Tuple[str, ...] = (), stamp: Optional[List[Any]] = None) -> Optional[CacheEntry]:
+        """Store result in both cache tiers without blocking the event loop"""
+        if not self.redis_client:
+            return self._store_in_cache(cache_key, data, delta, tags, stamp)  # In-process only; nothing to await
+        client = self._get_async_redis()
+        if client is None:
+            return await asyncio.get_running_loop().run_in_executor(
+                None, self._store_in_cache, cache_key, data, delta, tags, stamp
             )
+        
+        try:
+            entry, encoded = self._new_cache_entry(data, delta, stamp)
+        except Exception as e:
+            self.logger.warning(f"Cache write failed: {e}")
+            return None
+        
+        try:
+            if self.local_cache is not None:
+                self.local_cache.set(cache_key, entry, entry.size, self._local_entry_ttl(entry), tags)
+            ttl = self._storage_ttl(stamp)
+            pipe = client.pipeline(transaction=False)
+            pipe.setex(cache_key, ttl, encoded)
+            if tags:
+                self._tag_entry(pipe, cache_key, ttl, tags)
+            await pipe.execute()
             self.logger.debug(f"Data cached with key: {cache_key}")
         except Exception as e:
             self.logger.warning(f"Cache write failed: {e}")
+        return entry
+    
+    def pool_stats(self) -> Dict[str, Any]:
+        """Return connection pool statistics per backend"""
+        stats: Dict[str, Any] = {
+            'sqlite': {path: pool.stats() for path, pool in self._sqlite_pools.items()}
+        }
+        for path, writer in self._sqlite_writers.items():
+            if path in stats['sqlite']:
+                stats['sqlite'][path]['group_commit'] = writer.stats()
+        for path, replica in self._sqlite_replicas.items():
+            for pool_stats in stats['sqlite'].values():
+                if pool_stats['db_path'] == path:
+                    pool_stats['replica'] = replica.stats()
+        for name, pool in self._connection_pools.items():
+            stats[name] = pool.stats()
+        return stats
     
-    def _format_response(self, data: Any, from_cache: bool = False) -> Dict[str, Any]:
+    def close(self) -> None:
+        """Release pooled connections and cache clients"""
+        self._reaper_stop.set()
+        if self._reaper is not None:
+            self._reaper.join()
+        with self._pools_lock:
+            for writer in self._sqlite_writers.values():
+                writer.close()
+            self._sqlite_writers.clear()
+            for replica in self._sqlite_replicas.values():
+                replica.close()
+            self._sqlite_replicas.clear()
+            for detector in self._sqlite_detectors.values():
+                detector.close()
+            self._sqlite_detectors.clear()
+            for pool in self._sqlite_pools.values():
+                pool.close()
+            self._sqlite_pools.clear()
+            for pool in self._connection_pools.values():
+                pool.close()
+            self._connection_pools.clear()
+            for client in self._mongo_clients.values():
+                try:
+                    client.close()
+                except Exception as e:
+                    self.logger.warning(f"MongoDB client close failed: {e}")
+            self._mongo_clients.clear()
+            executors = list(self._executors.values())
+            self._executors.clear()
+        for executor in executors:
+            executor.shutdown(wait=True)
+        if self.redis_client is not None:
+            try:
+                self.redis_client.close()
+            except Exception as e:
+                self.logger.warning(f"Redis close failed: {e}")
+    
+    async def aclose(self) -> None:
+        """Close the asyncio Redis client, then release everything close() owns"""
+        client, self._async_redis_client = self._async_redis_client, None
+        self._async_redis_loop = None
+        if client is not None:
+            try:
+                await (client.aclose() if hasattr(client, 'aclose') else client.close())
+            except Exception as e:
+                self.logger.warning(f"Async Redis close failed: {e}")
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
+    
+    def _format_response(self, data: Any, from_cache: bool = False,
+                         request: Optional[DatabaseRequest] = None,
+                         started: Optional[float] = None) -> Dict[str, Any]:
         """Format successful response"""
+        return self.envelope.success(
+            data, from_cache,
+            request.db_type if request else None,
+            request.request_id if request else None,
+            started
+        )
+    
+    def _encode_response(self, payload: bytes, from_cache: bool = False,
+                         request: Optional[DatabaseRequest] = None,
+                         started: Optional[float] = None) -> bytes:
+        """Build the JSON-encoded success response around already-encoded data"""
+        return self.envelope.encode_success(
+            payload, from_cache,
+            request.db_type if request else None,
+            request.request_id if request else None,
+            started
+        )
+    
+    def _format_error_response(self, error_message: str,
+                               request: Optional[DatabaseRequest] = None,
+                               started: Optional[float] = None,
+                               request_data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Format error response"""
+        if request is not None:
+            backend, request_id = request.db_type, request.request_id
+        else:
+            # Parsing failed; report whatever the client sent
+            request_data = request_data if isinstance(request_data, dict) else {}
+            backend = request_data.get('db_type')
+            request_id = self.envelope.request_id(request_data.get('request_id'))
+        return self.envelope.error(error_message, backend, request_id, started)
+
+class StdioTransport:
+    """
+    JSON-RPC 2.0 over stdio using MCP framing (one message per line)
+    
+    Requests are dispatched as independent tasks, so responses are written as
+    soon as each finishes and may arrive out of order; clients match them by id.
+    Reading stops while max_in_flight requests are outstanding.
+    """
+    
+    PROTOCOL_VERSION = '2024-11-05'
+    
+    QUERY_TOOL = {
+        'name': 'query',
+        'description': 'Run a database operation against a configured backend',
+        'inputSchema': {
+            'type': 'object',
+            'properties': {
+                'db_type': {'type': 'string', 'enum': list(SUPPORTED_BACKENDS)},
+                'operation': {'type': 'string'},
+                'query': {'type': 'string'},
+                'parameters': {},
+                'cache_key': {'type': 'string'},
+                'stream': {'type': 'boolean'},
+                'request_id': {'type': 'string'}
+            },
+            'required': ['db_type', 'operation']
+        }
+    }
+    
+    def __init__(self, server: MCPDatabaseServer, max_in_flight: Optional[int] = None,
+                 reader: Optional[asyncio.StreamReader] = None, writer: Optional[Any] = None):
+        self.server = server
+        self.logger = server.logger
+        if max_in_flight is None:
+            max_in_flight = server.config.get('stdio', {}).get('max_in_flight', 64)
+        self.max_in_flight = max(1, int(max_in_flight))
+        self._reader = reader
+        self._writer = writer
+        self._write_lock: Optional[asyncio.Lock] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._in_flight: Dict[Any, asyncio.Task] = {}
+        self._pending_writes: set = set()
+        self._methods: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+            'initialize': self._initialize,
+            'ping': self._ping,
+            'tools/list': self._tools_list,
+            'tools/call': self._tools_call,
+            'db/query': self._db_query,
+            'db/batch': self._db_batch,
+        }
+    
+    async def serve(self) -> None:
+        """Read and dispatch messages until stdin is closed, then drain in-flight requests"""
+        loop = asyncio.get_running_loop()
+        self._write_lock = asyncio.Lock()
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        if self._reader is None:
+            self._reader = asyncio.StreamReader(limit=2 ** 26)
+            await loop.connect_read_pipe(
+                lambda: asyncio.StreamReaderProtocol(self._reader), sys.stdin
+            )
+        if self._writer is None:
+            transport, protocol = await loop.connect_write_pipe(
+                asyncio.streams.FlowControlMixin, sys.stdout
+            )
+            self._writer = asyncio.StreamWriter(transport, protocol, None, loop)
+        
+        while True:
+            # Backpressure: do not read the next message until a slot is free
+            await self._slots.acquire()
+            line = await self._reader.readline()
+            if not line:
+                self._slots.release()
+                break
+            if not line.strip():
+                self._slots.release()
+                continue
+            self._handle_line(line)
+        
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight.values(), return_exceptions=True)
+        if self._pending_writes:
+            await asyncio.gather(*self._pending_writes, return_exceptions=True)
+    
+    def _handle_line(self, line: bytes) -> None:
+        """Handle one framed message; its slot is released unless a request task now owns it"""
+        try:
+            task = self._accept(line)
+        except Exception as e:
+            # Nothing may escape into serve(): that would stop reading stdin
+            self.logger.error(f"Failed to handle message: {e}")
+            task = None
+        if task is None:
+            self._slots.release()
+    
+    def _accept(self, line: bytes) -> Optional[asyncio.Task]:
+        """Parse one message and either handle it inline or spawn and return a request task"""
+        try:
+            message = json.loads(line)
+        except ValueError as e:
+            self._spawn_write(self._error(None, -32700, f"Parse error: {e}"))
+            return None
+        
+        if not isinstance(message, dict) or message.get('jsonrpc') != '2.0' or 'method' not in message:
+            if isinstance(message, dict) and 'method' not in message and 'id' in message:
+                return None  # A response from the client; nothing is awaiting it
+            request_id = message.get('id') if isinstance(message, dict) else None
+            self._spawn_write(self._error(
+                request_id if self._valid_id(request_id) else None, -32600, "Invalid Request"
+            ))
+            return None
+        
+        if 'id' not in message:
+            self._handle_notification(message)
+            return None
+        
+        request_id = message['id']
+        if (not self._valid_id(request_id) or not isinstance(message['method'], str) or
+                not isinstance(message.get('params', {}), (dict, type(None)))):
+            self._spawn_write(self._error(
+                request_id if self._valid_id(request_id) else None, -32600, "Invalid Request"
+            ))
+            return None
+        
+        task = asyncio.ensure_future(self._dispatch(message))
+        self._in_flight[request_id] = task
+        
+        def _done(_task, request_id=request_id):
+            if self._in_flight.get(request_id) is _task:
+                del self._in_flight[request_id]
+            self._slots.release()
+        
+        task.add_done_callback(_done)
+        return task
+    
+    @staticmethod
+    def _valid_id(request_id: Any) -> bool:
+        """JSON-RPC ids are strings, numbers or null (bool is not a number here)"""
+        return request_id is None or (isinstance(request_id, (str, int, float)) and
+                                      not isinstance(request_id, bool))
+    
+    def _handle_notification(self, message: Dict[str, Any]) -> None:
+        if message['method'] == 'notifications/cancelled':
+            params = message.get('params')
+            if not isinstance(params, dict):
+                return
+            request_id = params.get('requestId')
+            if not self._valid_id(request_id):
+                return
+            task = self._in_flight.get(request_id)
+            if task is not None:
+                self.logger.info(f"Cancelling request {request_id}")
+                task.cancel()
+    
+    async def _dispatch(self, message: Dict[str, Any]) -> None:
+        request_id = message['id']
+        params = message.get('params') or {}
+        if message['method'] == 'db/query' and params.get('stream'):
+            await self._stream_query(request_id, params)
+            return
+        handler = self._methods.get(message['method'])
+        if handler is None:
+            await self._write(self._error(request_id, -32601, f"Method not found: {message['method']}"))
+            return
+        try:
+            result = await handler(params)
+        except asyncio.CancelledError:
+            # Cancelled requests get no response, per the MCP cancellation flow
+            return
+        except Exception as e:
+            self.logger.error(f"Request {request_id} failed: {e}")
+            await self._write(self._error(request_id, -32603, str(e)))
+            return
+        if isinstance(result, RawJSON):
+            head = json.dumps({'jsonrpc': '2.0', 'id': request_id}, separators=(',', ':'))
+            data = head[:-1].encode('utf-8') + b',"result":' + result.value + b'}\n'
+            await self._write_bytes(data)
+            return
+        await self._write({'jsonrpc': '2.0', 'id': request_id, 'result': result})
+    
+    async def _stream_query(self, request_id: Any, params: Dict[str, Any]) -> None:
+        """
+        Send each chunk as a db/partialResult notification, then the summary
+        envelope as the response; a cancelled stream sends no response
+        """
+        id_json = json.dumps(request_id).encode('utf-8')
+        notification_head = (b'{"jsonrpc":"2.0","method":"db/partialResult","params":{"requestId":' +
+                             id_json + b',"partial":')
+        try:
+            async for line in self.server.astream_client_request(params):
+                body = line.rstrip(b'\n')
+                if body.startswith(b'{"chunk":'):
+                    await self._write_bytes(notification_head + body + b'}}\n')
+                else:
+                    await self._write_bytes(b'{"jsonrpc":"2.0","id":' + id_json +
+                                            b',"result":' + body + b'}\n')
+        except asyncio.CancelledError:
+            return
+    
+    async def _initialize(self, params: Dict[str, Any]) -> Dict[str, Any]:
         return {
-            "status": "success",
-            "data": data,
-            "from_cache": from_cache,
-            "timestamp": str(Path(__file__).stat().st_mtime)
+            'protocolVersion': params.get('protocolVersion', self.PROTOCOL_VERSION),
+            'capabilities': {'tools': {}},
+            'serverInfo': {'name': 'mcp-database-server', 'version': __version__}
         }
     
-    def _format_error_response(self, error_message: str) -> Dict[str, Any]:
-        """Format error response"""
+    async def _ping(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return {}
+    
+    async def _tools_list(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return {'tools': [self.QUERY_TOOL]}
+    
+    async def _tools_call(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        if params.get('name') != self.QUERY_TOOL['name']:
+            raise ValueError(f"Unknown tool: {params.get('name')}")
+        response = await self.server.areceive_client_request_raw(params.get('arguments') or {})
         return {
-            "status": "error",
-            "error": error_message,
-            "timestamp": str(Path(__file__).stat().st_mtime)
+            'content': [{'type': 'text', 'text': response.decode('utf-8')}],
+            'isError': not response.startswith(b'{"status": "success"')
         }
+    
+    async def _db_query(self, params: Dict[str, Any]) -> RawJSON:
+        """Non-MCP fast path: the response envelope itself is the JSON-RPC result"""
+        return RawJSON(await self.server.areceive_client_request_raw(params))
+    
+    async def _db_batch(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Run params['requests'] as one batch; results are in request order"""
+        return {'results': await self.server.areceive_batch_request(params.get('requests'))}
+    
+    @staticmethod
+    def _error(request_id: Any, code: int, message: str) -> Dict[str, Any]:
+        return {'jsonrpc': '2.0', 'id': request_id, 'error': {'code': code, 'message': message}}
+    
+    def _spawn_write(self, message: Dict[str, Any]) -> None:
+        task = asyncio.ensure_future(self._write(message))
+        self._pending_writes.add(task)
+        task.add_done_callback(self._pending_writes.discard)
+    
+    async def _write(self, message: Dict[str, Any]) -> None:
+        data = json.dumps(message, default=str, separators=(',', ':')).encode('utf-8') + b'\n'
+        await self._write_bytes(data)
+    
+    async def _write_bytes(self, data: bytes) -> None:
+        async with self._write_lock:
+            self._writer.write(data)
+            await self._writer.drain()
+
+async def serve_stdio(server: MCPDatabaseServer, max_in_flight: Optional[int] = None) -> None:
+    """Serve MCP JSON-RPC on stdin/stdout until the client closes stdin"""
+    try:
+        await StdioTransport(server, max_in_flight=max_in_flight).serve()
+    finally:
+        await server.aclose()
 
 def main():
     """Example usage of the MCP Database Server"""
+    parser = argparse.ArgumentParser(description="MCP Database Server")
+    parser.add_argument('--stdio', action='store_true',
+                        help="serve MCP JSON-RPC over stdin/stdout instead of running the example")
+    parser.add_argument('--max-in-flight', type=int, default=None,
+                        help="maximum number of concurrently executing requests in --stdio mode")
+    args = parser.parse_args()
+    
     server = MCPDatabaseServer()
     
+    if args.stdio:
+        asyncio.run(serve_stdio(server, max_in_flight=args.max_in_flight))
+        return
+    
     # Example SQLite request
     sqlite_request = {
         "db_type": "sqlite",
@@ -364,8 +4237,11 @@ def main():
         "cache_key": "sqlite_tables"
     }
     
-    response = server.receive_client_request(sqlite_request)
-    print("SQLite Response:", json.dumps(response, indent=2))
+    try:
+        response = server.receive_client_request(sqlite_request)
+        print("SQLite Response:", json.dumps(response, indent=2))
+    finally:
+        server.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,118 @@
+import threading
+import time
+
+import pytest
+
+from mcp_database_server import ConnectionPool
+
+
+class FakeConnection:
+    """DB-API stand-in that records what the pool does with it"""
+    
+    def __init__(self, number):
+        self.number = number
+        self.healthy = True
+        self.closed = False
+        self.rollbacks = 0
+    
+    def rollback(self):
+        if not self.healthy:
+            raise RuntimeError('connection lost')
+        self.rollbacks += 1
+    
+    def close(self):
+        self.closed = True
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.connections = []
+    
+    def connect(self):
+        connection = FakeConnection(len(self.connections) + 1)
+        self.connections.append(connection)
+        return connection
+
+
+def _pool(database, **kwargs):
+    kwargs.setdefault('validate', lambda conn, idle: conn.healthy)
+    kwargs.setdefault('reset', lambda conn: conn.rollback())
+    return ConnectionPool(database.connect, name='fake', **kwargs)
+
+
+def test_warm_up_opens_min_size_connections():
+    database = FakeDatabase()
+    pool = _pool(database, min_size=3, max_size=5)
+    assert pool.warm_up() == 3
+    assert pool.warm_up() == 0
+    stats = pool.stats()
+    assert (stats['size'], stats['idle'], stats['connections_opened']) == (3, 3, 3)
+
+
+def test_unhealthy_idle_connection_is_replaced_on_checkout():
+    database = FakeDatabase()
+    pool = _pool(database, max_size=1)
+    with pool.connection() as conn:
+        first = conn
+    first.healthy = False
+    with pool.connection() as conn:
+        assert conn is not first
+    assert first.closed
+    assert pool.stats()['validation_failures'] == 1
+
+
+def test_connection_past_max_lifetime_is_retired():
+    database = FakeDatabase()
+    pool = _pool(database, max_lifetime=0.01)
+    with pool.connection() as conn:
+        first = conn
+    time.sleep(0.02)
+    with pool.connection() as conn:
+        assert conn is not first
+    assert first.closed
+    assert pool.stats()['lifetime_expired'] == 1
+
+
+def test_checkout_times_out_when_the_pool_is_exhausted():
+    pool = _pool(FakeDatabase(), max_size=1, timeout=0.05)
+    with pool.connection():
+        with pytest.raises(RuntimeError, match='Timed out'):
+            with pool.connection():
+                pass
+    assert pool.stats()['in_use'] == 0
+
+
+def test_connection_is_reset_after_an_error_and_dropped_when_reset_fails():
+    database = FakeDatabase()
+    pool = _pool(database)
+    with pytest.raises(ValueError):
+        with pool.connection() as conn:
+            raise ValueError('query failed')
+    assert conn.rollbacks == 1 and not conn.closed
+    with pytest.raises(ValueError):
+        with pool.connection() as conn:
+            conn.healthy = False
+            raise ValueError('query failed')
+    assert conn.closed
+    assert pool.stats()['size'] == 0
+
+
+def test_waiting_checkouts_are_measured():
+    pool = _pool(FakeDatabase(), max_size=1)
+    checked_out = threading.Event()
+    
+    def hold():
+        with pool.connection():
+            checked_out.set()
+            time.sleep(0.05)
+    
+    holder = threading.Thread(target=hold)
+    holder.start()
+    checked_out.wait(5)
+    with pool.connection():
+        pass
+    holder.join()
+    stats = pool.stats()
+    assert (stats['checkouts'], stats['waits']) == (2, 1)
+    assert stats['wait_time_max'] >= 0.02
+    assert stats['wait_time_avg'] == pytest.approx(stats['wait_time_total'] / 2)
@@ -0,0 +1,41 @@
+import sqlite3
+import threading
+
+from mcp_database_server import MCPDatabaseServer
+
+
+def test_lookups_with_equal_text_but_different_types_stay_separate(tmp_path):
+    db_path = str(tmp_path / 'lookups.db')
+    connection = sqlite3.connect(db_path)
+    connection.execute('CREATE TABLE t (k, v INTEGER)')
+    connection.executemany('INSERT INTO t VALUES (?, ?)', [(1, 10), ('1', 11)])
+    connection.commit()
+    connection.close()
+    server = MCPDatabaseServer({
+        'sqlite': {'enabled': True, 'db_path': db_path},
+        'redis': {'enabled': False},
+        'local_cache': {'enabled': False},
+        'micro_batching': {'enabled': True, 'window_ms': 50, 'max_batch': 100}
+    })
+    results = {}
+    
+    def lookup(index, value):
+        results[index] = server.receive_client_request({
+            'db_type': 'sqlite', 'operation': 'select',
+            'query': 'SELECT v FROM t WHERE k = ?', 'parameters': [value]
+        })['data']
+    
+    try:
+        threads = [threading.Thread(target=lookup, args=item) for item in enumerate([1, '1', 1])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert server.cache_stats()['micro_batching']['batches'] == 1
+    finally:
+        server.close()
+    
+    assert results == {0: [{'v': 10}], 1: [{'v': 11}], 2: [{'v': 10}]}
+    # Callers of the same key do not share row objects
+    results[0][0]['v'] = -1
+    assert results[2] == [{'v': 10}]
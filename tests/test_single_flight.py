@@ -0,0 +1,108 @@
+import asyncio
+import copy
+import threading
+import time
+
+import pytest
+
+from mcp_database_server import MCPDatabaseServer, SingleFlight
+
+
+def _wait_for_followers(flight, count):
+    deadline = time.monotonic() + 5
+    while flight.stats()['followers'] < count:
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def test_concurrent_callers_share_one_execution():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+    
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return [{'x': 1}]
+    
+    results = [None] * 4
+    
+    def call(index):
+        results[index] = flight.do('key', fetch, share=copy.deepcopy)
+    
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(4)]
+    threads[0].start()
+    while not calls:
+        time.sleep(0.005)
+    for thread in threads[1:]:
+        thread.start()
+    _wait_for_followers(flight, 3)
+    release.set()
+    for thread in threads:
+        thread.join()
+    
+    assert calls == [1]
+    assert flight.stats()['leaders'] == 1
+    assert results == [[{'x': 1}]] * 4
+    # Each caller owns its result: mutating one leaves the others untouched
+    results[1][0]['x'] = 99
+    results[2].append('extra')
+    assert results[0] == results[3] == [{'x': 1}]
+    assert len({id(result) for result in results}) == 4
+
+
+def test_followers_receive_the_leaders_exception():
+    flight = SingleFlight()
+    release = threading.Event()
+    errors = []
+    
+    def fetch():
+        release.wait(5)
+        raise ValueError('boom')
+    
+    def call():
+        try:
+            flight.do('key', fetch)
+        except ValueError as e:
+            errors.append(str(e))
+    
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    threads[0].start()
+    time.sleep(0.02)
+    for thread in threads[1:]:
+        thread.start()
+    _wait_for_followers(flight, 2)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert errors == ['boom'] * 3
+
+
+def test_async_followers_get_their_own_copy():
+    async def scenario():
+        flight = SingleFlight()
+        release = asyncio.Event()
+        
+        async def fetch():
+            await release.wait()
+            return {'rows': [1, 2]}
+        
+        tasks = [asyncio.ensure_future(flight.ado('key', fetch, share=copy.deepcopy)) for _ in range(3)]
+        for _ in range(5):
+            await asyncio.sleep(0)
+        release.set()
+        return flight.stats(), await asyncio.gather(*tasks)
+    
+    stats, results = asyncio.run(scenario())
+    assert (stats['leaders'], stats['followers']) == (1, 2)
+    results[0]['rows'].append(3)
+    assert results[1] == results[2] == {'rows': [1, 2]}
+
+
+@pytest.mark.parametrize('payload', [b'[{"x": 1}]', None])
+def test_server_share_copies_the_fetch_result(payload):
+    result = [{'x': 1}]
+    shared, shared_payload = MCPDatabaseServer._share_fetch((result, payload))
+    assert shared == result and shared is not result
+    assert shared[0] is not result[0]
+    assert shared_payload is payload
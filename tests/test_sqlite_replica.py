@@ -0,0 +1,36 @@
+import pytest
+
+from mcp_database_server import MCPDatabaseServer, SQLITE_PRAGMA_PROFILES
+
+
+def _query(server, operation, query):
+    return server.receive_client_request({'db_type': 'sqlite', 'operation': operation, 'query': query})
+
+
+@pytest.mark.parametrize('profile', sorted(SQLITE_PRAGMA_PROFILES))
+def test_replica_serves_reads_with_pragma_profile(tmp_path, profile):
+    server = MCPDatabaseServer({
+        'sqlite': {
+            'enabled': True,
+            'db_path': str(tmp_path / 'replica.db'),
+            'pragma_profile': profile,
+            'in_memory_replica': True,
+            'replica_check_interval': 0.05
+        },
+        'redis': {'enabled': False},
+        'local_cache': {'enabled': False}
+    })
+    try:
+        assert _query(server, 'execute', 'CREATE TABLE t (x INTEGER)')['status'] == 'success'
+        assert _query(server, 'insert', 'INSERT INTO t VALUES (1)')['status'] == 'success'
+        # Refresh explicitly rather than racing the watcher thread
+        for replica in server._sqlite_replicas.values():
+            replica.refresh()
+        response = _query(server, 'select', 'SELECT x FROM t')
+        assert response['status'] == 'success', response
+        assert response['data'] == [{'x': 1}]
+        replica_stats = next(stats['replica'] for stats in server.pool_stats()['sqlite'].values()
+                             if 'replica' in stats)
+        assert replica_stats['refresh_failures'] == 0
+    finally:
+        server.close()
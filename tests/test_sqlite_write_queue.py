@@ -0,0 +1,55 @@
+import sqlite3
+
+import pytest
+
+from mcp_database_server import SQLitePool, SQLiteWriteQueue
+
+
+@pytest.fixture
+def pool(tmp_path):
+    db_path = str(tmp_path / 'writes.db')
+    connection = sqlite3.connect(db_path)
+    connection.execute('CREATE TABLE t (x INTEGER PRIMARY KEY)')
+    connection.commit()
+    connection.close()
+    pool = SQLitePool(db_path)
+    yield pool
+    pool.close()
+
+
+def _rows(pool):
+    with pool.reader() as conn:
+        return [row[0] for row in conn.execute('SELECT x FROM t ORDER BY x')]
+
+
+def test_queued_writes_share_one_commit(pool):
+    writes = SQLiteWriteQueue(pool, max_batch=10, max_wait=0.2)
+    futures = [writes.submit('INSERT INTO t VALUES (?)', (x,)) for x in (1, 2, 3)]
+    results = [future.result(5) for future in futures]
+    writes.close()
+    assert [result['affected_rows'] for result in results] == [1, 1, 1]
+    assert _rows(pool) == [1, 2, 3]
+    stats = writes.stats()
+    assert (stats['batches'], stats['writes'], stats['largest_batch']) == (1, 3, 3)
+
+
+def test_failed_write_is_rolled_back_alone(pool):
+    writes = SQLiteWriteQueue(pool, max_batch=10, max_wait=0.2)
+    first = writes.submit('INSERT INTO t VALUES (?)', (1,))
+    duplicate = writes.submit('INSERT INTO t VALUES (?)', (1,))
+    last = writes.submit('INSERT INTO t VALUES (?)', (2,))
+    assert first.result(5)['affected_rows'] == 1
+    with pytest.raises(sqlite3.IntegrityError):
+        duplicate.result(5)
+    assert last.result(5)['affected_rows'] == 1
+    writes.close()
+    assert _rows(pool) == [1, 2]
+    stats = writes.stats()
+    assert (stats['batches'], stats['writes'], stats['failed_writes']) == (1, 2, 1)
+
+
+def test_submit_after_close_is_rejected(pool):
+    writes = SQLiteWriteQueue(pool)
+    writes.close()
+    with pytest.raises(RuntimeError):
+        writes.submit('INSERT INTO t VALUES (1)', ())
@@ -0,0 +1,104 @@
+import asyncio
+import json
+
+import pytest
+
+from mcp_database_server import MCPDatabaseServer, StdioTransport
+
+
+class _Writer:
+    def __init__(self):
+        self.lines = []
+    
+    def write(self, data):
+        self.lines.extend(json.loads(line) for line in data.splitlines())
+    
+    async def drain(self):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = MCPDatabaseServer({
+        'sqlite': {'enabled': False},
+        'redis': {'enabled': False},
+        'local_cache': {'enabled': False}
+    })
+    yield server
+    server.close()
+
+
+def _transport(server, max_in_flight, release):
+    reader = asyncio.StreamReader()
+    writer = _Writer()
+    transport = StdioTransport(server, max_in_flight=max_in_flight, reader=reader, writer=writer)
+    
+    async def slow(params):
+        await release.wait()
+        return {'done': params.get('n')}
+    
+    transport._methods['slow'] = slow
+    return transport, reader, writer
+
+
+def _line(message):
+    return json.dumps(message).encode('utf-8') + b'\n'
+
+
+def test_reading_pauses_while_max_in_flight_requests_run(server):
+    async def scenario():
+        release = asyncio.Event()
+        transport, reader, writer = _transport(server, 1, release)
+        for n in (1, 2):
+            reader.feed_data(_line({'jsonrpc': '2.0', 'id': n, 'method': 'slow', 'params': {'n': n}}))
+        reader.feed_eof()
+        serving = asyncio.ensure_future(transport.serve())
+        for _ in range(10):
+            await asyncio.sleep(0)
+        assert list(transport._in_flight) == [1]
+        assert not reader.at_eof()  # The second request has not been read yet
+        release.set()
+        await serving
+        return writer.lines
+    
+    lines = asyncio.run(scenario())
+    assert [line['result'] for line in lines] == [{'done': 1}, {'done': 2}]
+
+
+def test_cancelled_request_gets_no_response(server):
+    async def scenario():
+        release = asyncio.Event()
+        transport, reader, writer = _transport(server, 4, release)
+        reader.feed_data(_line({'jsonrpc': '2.0', 'id': 'a', 'method': 'slow', 'params': {}}))
+        reader.feed_data(_line({'jsonrpc': '2.0', 'method': 'notifications/cancelled',
+                                'params': {'requestId': 'a'}}))
+        reader.feed_data(_line({'jsonrpc': '2.0', 'id': 'b', 'method': 'ping'}))
+        reader.feed_eof()
+        await transport.serve()
+        return writer.lines
+    
+    assert asyncio.run(scenario()) == [{'jsonrpc': '2.0', 'id': 'b', 'result': {}}]
+
+
+def test_malformed_messages_are_rejected_without_stopping_the_reader(server):
+    async def scenario():
+        transport, reader, writer = _transport(server, 1, asyncio.Event())
+        for message in (
+            {'jsonrpc': '2.0', 'method': 'notifications/cancelled', 'params': ['x']},
+            {'jsonrpc': '2.0', 'method': 'notifications/cancelled', 'params': {'requestId': [1]}},
+            {'jsonrpc': '2.0', 'id': [1], 'method': 'ping'},
+            {'jsonrpc': '2.0', 'id': True, 'method': 'ping'},
+            {'jsonrpc': '2.0', 'id': 3, 'method': 'ping', 'params': 'x'},
+            {'jsonrpc': '2.0', 'id': 4, 'method': 7},
+            {'jsonrpc': '2.0', 'id': 5, 'method': 'ping'},
+        ):
+            reader.feed_data(_line(message))
+        reader.feed_data(b'{not json\n')
+        reader.feed_eof()
+        await asyncio.wait_for(transport.serve(), 5)
+        return writer.lines
+    
+    lines = asyncio.run(scenario())
+    assert [(line['id'], line.get('error', {}).get('code')) for line in lines] == [
+        (None, -32600), (None, -32600), (3, -32600), (4, -32600), (5, None), (None, -32700)
+    ]